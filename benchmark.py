@@ -0,0 +1,189 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from random import Random
+
+from cache import LRUCache
+from evaluation import calculate_routes, check_route, decode_incremental, split_routes, worth_reference
+from distance import create_distance_matrix
+from loader import load_instance
+from solver import Params, crossover, mutate, solve
+from two_opt import optimize_route_2opt
+
+# po jednej instancji z każdej rodziny Solomona
+DEFAULT_DATASETS = ["data/c101.txt", "data/c201.txt", "data/r101.txt",
+                    "data/r201.txt", "data/rc101.txt", "data/rc201.txt"]
+
+NUM_GENOMES = 50
+GA_PARAMS = {"population_size": 20, "generations": 20, "tournament_size": 3, "mutation_rate": 0.05}
+
+
+def make_inputs(instance, seed):
+    rng = Random(seed)
+    customer_ids = list(range(1, len(instance)))
+
+    genomes = []
+    for _ in range(NUM_GENOMES):
+        genome = customer_ids[:]
+        rng.shuffle(genome)
+        genomes.append(genome)
+
+    # losowe permutacje dają krótkie trasy, więc dokładamy dłuższe trasy z porządku wg okien czasowych
+    by_ready_time = sorted(customer_ids, key=lambda c: instance.ready_times[c])
+    routes, _ = split_routes(by_ready_time, instance)
+    for genome in genomes[:10]:
+        routes.extend(calculate_routes(genome, instance)[0])
+    routes = [r for r in routes if len(r) > 2]
+
+    # potomkowie OX z mutacją jak w GA; referencja (rodzic, który dał segment) tylko tam,
+    # gdzie dałby ją GA z --incremental
+    offspring = []
+    for _ in range(NUM_GENOMES):
+        parent1, parent2 = rng.sample(genomes, 2)
+        child, kept = crossover(parent1, parent2, rng)
+        if rng.random() < GA_PARAMS["mutation_rate"]:
+            child = mutate(child, rng)
+        offspring.append((child, parent1 if worth_reference(kept, len(child)) else None))
+
+    return genomes, routes, offspring
+
+
+def make_kernels(instance, genomes, routes, offspring, seed):
+    def distance_matrix():
+        create_distance_matrix(instance.x, instance.y)
+        return 1
+
+    def decode():
+        for genome in genomes:
+            calculate_routes(genome, instance)
+        return len(genomes)
+
+    decode_cache = LRUCache(2 * NUM_GENOMES)
+    for genome in genomes:
+        decode_incremental(genome, instance, decode_cache)
+
+    def decode_offspring():
+        for child, _ in offspring:
+            calculate_routes(child, instance)
+        return len(offspring)
+
+    def decode_offspring_incremental():
+        for child, parent in offspring:
+            decode_incremental(child, instance, decode_cache, parent)
+        return len(offspring)
+
+    def check():
+        for route in routes:
+            check_route(route, instance)
+        return len(routes)
+
+    def two_opt():
+        for route in routes:
+            optimize_route_2opt(route, instance)
+        return len(routes)
+
+    def ga():
+        params = Params(**GA_PARAMS, seed=seed, verbose=False)
+        solve(instance, params)
+        return params.generations
+
+    return {
+        "create_distance_matrix": distance_matrix,
+        "calculate_routes": decode,
+        "decode_offspring": decode_offspring,
+        "decode_offspring_inc": decode_offspring_incremental,
+        "check_route": check,
+        "optimize_route_2opt": two_opt,
+        "ga_short_run": ga
+    }
+
+
+def measure(kernel, repeat, min_time):
+    best = 0.0
+    for _ in range(repeat):
+        ops = 0
+        start = time.perf_counter()
+        elapsed = 0.0
+        while elapsed < min_time:
+            ops += kernel()
+            elapsed = time.perf_counter() - start
+        best = max(best, ops / elapsed)
+
+    tracemalloc.start()
+    kernel()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {"ops_per_sec": best, "peak_memory_kb": peak / 1024}
+
+
+def run_benchmarks(datasets, repeat=3, min_time=0.2, seed=0, kernels=None):
+    results = {}
+    for filename in datasets:
+        instance = load_instance(filename, verbose=False)
+        genomes, routes, offspring = make_inputs(instance, seed)
+        ds_name = os.path.splitext(os.path.basename(filename))[0]
+        results[ds_name] = {}
+
+        for name, kernel in make_kernels(instance, genomes, routes, offspring, seed).items():
+            if kernels and name not in kernels:
+                continue
+            stats = measure(kernel, repeat, min_time)
+            results[ds_name][name] = stats
+            print(f"{ds_name:8} {name:24} {stats['ops_per_sec']:12.1f} ops/s {stats['peak_memory_kb']:10.1f} KB")
+
+    return results
+
+
+def compare(results, baseline, threshold):
+    regressions = []
+    for ds_name, kernels in results.items():
+        for name, stats in kernels.items():
+            base = baseline.get(ds_name, {}).get(name)
+            if base is None:
+                continue
+            ratio = stats["ops_per_sec"] / base["ops_per_sec"]
+            if ratio < 1.0 - threshold:
+                regressions.append((ds_name, name, ratio))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument("datasets", nargs="*", default=DEFAULT_DATASETS)
+    parser.add_argument("--kernel", action="append", default=None, help="mierz tylko wybrane kernele")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--min-time", type=float, default=0.2, help="minimalny czas jednej serii [s]")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save", default=None, help="zapisz wyniki jako baseline JSON")
+    parser.add_argument("--compare", default=None, help="porównaj z baseline JSON")
+    parser.add_argument("--threshold", type=float, default=0.2, help="dopuszczalny spadek ops/s (0.2 = 20%%)")
+
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.datasets, args.repeat, args.min_time, args.seed, args.kernel)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({"python": sys.version, "platform": platform.platform(), "results": results}, f, indent=2)
+        print(f"Baseline zapisany w {args.save}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+
+        regressions = compare(results, baseline, args.threshold)
+        for ds_name, name, ratio in regressions:
+            print(f"REGRESJA: {ds_name} {name} - {ratio:.0%} baseline")
+        if regressions:
+            sys.exit(1)
+        print(f"Brak regresji powyżej {args.threshold:.0%}")
+
+
+if __name__ == '__main__':
+    main()
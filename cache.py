@@ -0,0 +1,49 @@
+from collections import OrderedDict
+
+# cache genomów trafia prawie wyłącznie w elity i klony z bieżącego pokolenia, więc wystarcza
+# kilka pokoleń genomów; trasy powtarzają się między różnymi genomami przez cały przebieg
+GENOME_CACHE_GENERATIONS = 10
+ROUTE_CACHE_SIZE = 100000
+
+
+class LRUCache:
+    def __init__(self, maxsize=100000):
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        if key in self.data:
+            self.data.move_to_end(key)
+            self.hits += 1
+            return self.data[key]
+        self.misses += 1
+        return None
+
+    def put(self, key, value):
+        if self.maxsize <= 0:
+            return
+        self.data[key] = value
+        self.data.move_to_end(key)
+        if len(self.data) > self.maxsize:
+            self.data.popitem(last=False)
+
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self):
+        return {
+            "size": len(self.data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hit_rate()
+        }
+
+    def __len__(self):
+        return len(self.data)
+
+    def __repr__(self):
+        return f"LRUCache: {len(self.data)}/{self.maxsize} | Hits: {self.hits} | Misses: {self.misses}"
@@ -0,0 +1,72 @@
+import os
+import pickle
+
+import numpy as np
+
+CHECKPOINT_VERSION = 1
+
+
+class Checkpoint:
+    # stan GA zapisywany co `every` pokoleń; zapis do pliku tymczasowego i os.replace,
+    # więc przerwanie w trakcie zapisu zostawia poprzedni, kompletny checkpoint
+    # seed/spawn_key - ziarno przebiegu (entropia SeedSequence); wznowienie bez --seed używa zapisanego,
+    # więc wynik wznowionego przebiegu wskazuje ziarno, z którego da się go powtórzyć
+    def __init__(self, path, every=100, seed=None, spawn_key=()):
+        self.path = path
+        self.every = every
+        self.seed = seed
+        self.spawn_key = tuple(spawn_key)
+        self.saves = 0
+
+    def due(self, generation):
+        return self.every > 0 and generation % self.every == 0
+
+    def save(self, state):
+        state = dict(state)
+        state["version"] = CHECKPOINT_VERSION
+        state["seed"] = self.seed
+        state["spawn_key"] = self.spawn_key
+        # populacja jako jedna tablica int32 zamiast listy list
+        state["population"] = np.asarray(state["population"], dtype=np.int32)
+        state["cost_history"] = np.asarray(state["cost_history"], dtype=np.float64)
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self.saves += 1
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path, "rb") as f:
+            state = pickle.load(f)
+        if state.get("version") != CHECKPOINT_VERSION:
+            raise ValueError(f"Nieobsługiwana wersja checkpointu: {state.get('version')}")
+
+        state["population"] = state["population"].tolist()
+        state["cost_history"] = state["cost_history"].tolist()
+        return state
+
+
+def check_compatible(state, instance, params):
+    if state["dataset"] != instance.name or len(state["population"]) != params.population_size:
+        raise ValueError(f"Checkpoint dotyczy innego przebiegu: {state['dataset']}, "
+                         f"populacja {len(state['population'])}")
+    stored = state.get("seed")
+    spawn_key = tuple(params.spawn_key)
+    if params.seed is not None and stored is not None and (params.seed, spawn_key) != (stored, state["spawn_key"]):
+        raise ValueError(f"Checkpoint zapisano z ziarnem {state['seed']} (spawn_key {state['spawn_key']}), "
+                         f"a podano {params.seed} (spawn_key {spawn_key})")
+    # starsze checkpointy nie zapisywały silnika i dekodera - wtedy nie ma czego porównać
+    for name in ("engine", "decoder"):
+        if state.get(name) is not None and state[name] != getattr(params, name):
+            raise ValueError(f"Checkpoint zapisano z {name}={state[name]}, a podano {getattr(params, name)}")
+    if params.generations < state["generation"]:
+        raise ValueError(f"Checkpoint ma już {state['generation']} pokoleń, "
+                         f"a podano generations={params.generations}")
@@ -0,0 +1,66 @@
+import numpy as np
+
+# Backendy odległości. Pętle w czystym Pythonie zawsze indeksują dist_rows[i][j]:
+# "list" trzyma całą macierz jako listy floatów (najszybsze, n^2 obiektów na proces),
+# pozostałe trzymają macierz zwięźle i zamieniają na listy tylko ostatnio używane wiersze.
+#   float32 - gęsta macierz float32 (połowa pamięci float64, zaokrąglone odległości)
+#   mmap    - macierz float64 z pliku .npy otwarta przez mmap, strony współdzielone między procesami
+#   compute - brak macierzy, wiersze liczone ze współrzędnych na żądanie
+DISTANCE_BACKENDS = ("list", "float32", "mmap", "compute")
+ROW_CACHE = 256
+BLOCK_ROWS = 256
+
+
+def create_distance_matrix(x, y):
+    dx = x[:, None] - x[None, :]
+    dy = y[:, None] - y[None, :]
+    return np.hypot(dx, dy)
+
+
+def coordinate_block(x, y, start, stop):
+    return np.hypot(x[start:stop, None] - x[None, :], y[start:stop, None] - y[None, :])
+
+
+class RowCache(dict):
+    # dict z __missing__: trafienie to zwykłe indeksowanie dict, bez wywołania metody w Pythonie;
+    # po przekroczeniu maxsize usuwany jest najdawniej dodany wiersz
+    def __init__(self, block, maxsize=ROW_CACHE):
+        dict.__init__(self)
+        self.block = block
+        self.maxsize = max(1, maxsize)
+
+    def __missing__(self, i):
+        row = self.block(i, i + 1)[0].tolist()
+        if len(self) >= self.maxsize:
+            del self[next(iter(self))]
+        self[i] = row
+        return row
+
+
+def open_distance_matrix(path):
+    return np.load(path, mmap_mode="r")
+
+
+def prepare_distance(x, y, dist=None, backend="list", row_cache=ROW_CACHE):
+    # zwraca (macierz albo None, dist_rows, funkcja bloku wierszy [start, stop))
+    if backend not in DISTANCE_BACKENDS:
+        raise ValueError(f"Nieznany backend odległości: {backend}")
+
+    if backend == "compute":
+        def block(start, stop):
+            return coordinate_block(x, y, start, stop)
+        return None, RowCache(block, row_cache), block
+
+    if dist is None:
+        dist = create_distance_matrix(x, y)
+    if backend == "float32":
+        dist = np.ascontiguousarray(dist, dtype=np.float32)
+    elif not isinstance(dist, np.memmap):
+        dist = np.ascontiguousarray(dist, dtype=np.float64)
+
+    def block(start, stop):
+        return np.asarray(dist[start:stop], dtype=np.float64)
+
+    if backend == "list":
+        return dist, dist.tolist(), block
+    return dist, RowCache(block, row_cache), block
@@ -0,0 +1,140 @@
+import numpy as np
+
+from population import init_population, mutate_batch
+
+HASH_BASE = 1000003
+
+
+def row_hashes(population):
+    # wielomianowy hash każdego wiersza, arytmetyka uint64 z przepełnieniem (mod 2^64);
+    # kolizja kosztuje najwyżej jedną zbędną mutację
+    powers = np.cumprod(np.full(population.shape[1], HASH_BASE, dtype=np.uint64))
+    return (population.astype(np.uint64) * powers).sum(axis=1)
+
+
+class DiversityControl:
+    # mode: "remutate" - zduplikowany potomek jest mutowany, aż będzie unikalny (max_attempts prób),
+    #       "reject" - duplikat jest odrzucany i krzyżowanie powtarzane
+    # restart_threshold - gdy odsetek różnych wartości fitness spadnie poniżej progu, część potomstwa
+    # (restart_fraction populacji) jest zastępowana losowymi genomami; potem restart_cooldown pokoleń przerwy
+    def __init__(self, mode="remutate", max_attempts=5, restart_threshold=0.0, restart_fraction=0.5,
+                 restart_cooldown=50):
+        self.mode = mode
+        self.max_attempts = max_attempts
+        self.restart_threshold = restart_threshold
+        self.restart_fraction = restart_fraction
+        self.restart_cooldown = restart_cooldown
+
+        self.unique_genomes = []
+        self.unique_fitness = []
+        self.duplicates = 0
+        self.restarts = 0
+        self._cooldown = 0
+        self._seen = set()
+        self._rejected = 0
+        self._reject_budget = 0
+
+    @classmethod
+    def from_params(cls, params):
+        if params.diversity == "none":
+            return None
+        return cls(params.diversity, restart_threshold=params.restart_threshold,
+                   restart_fraction=params.restart_fraction, restart_cooldown=params.restart_cooldown)
+
+    def measure(self, genomes, scores):
+        n = len(genomes)
+        self.unique_genomes.append(len(set(map(tuple, genomes))) / n)
+        self.unique_fitness.append(len(set(score[0] for score in scores)) / n)
+
+    def restart_due(self):
+        if self._cooldown > 0:
+            self._cooldown -= 1
+            return False
+        if self.unique_fitness and self.unique_fitness[-1] < self.restart_threshold:
+            self._cooldown = self.restart_cooldown
+            self.restarts += 1
+            return True
+        return False
+
+    def restart_count(self, population_size, protected):
+        return min(population_size - protected, int(population_size * self.restart_fraction))
+
+    # --- populacja jako listy ---
+
+    def start_generation(self, genomes, population_size):
+        # genomy już w nowej populacji (elity, imigranci); odrzuceń najwyżej max_attempts na osobnika
+        self._seen = set(tuple(g) for g in genomes)
+        self._rejected = 0
+        self._reject_budget = self.max_attempts * population_size
+
+    def admit(self, child, rng, mutate):
+        # zwraca potomka do dodania albo None, gdy trzeba skrzyżować jeszcze raz
+        key = tuple(child)
+        if key in self._seen:
+            self.duplicates += 1
+            if self.mode == "reject" and self._rejected < self._reject_budget:
+                self._rejected += 1
+                return None
+            for _ in range(self.max_attempts):
+                child = mutate(child, rng)
+                key = tuple(child)
+                if key not in self._seen:
+                    break
+        self._seen.add(key)
+        return child
+
+    def restart_list(self, population, protected, rng):
+        count = self.restart_count(len(population), protected)
+        for k in range(len(population) - count, len(population)):
+            genome = sorted(population[k])
+            rng.shuffle(genome)
+            population[k] = genome
+
+    # --- populacja jako tablica NumPy ---
+
+    def dedup_rows(self, population, protected, np_rng):
+        # duplikaty wśród potomków (wiersze od `protected`) są mutowane; "reject" w wersji wektorowej
+        # też kończy się mutacją - ponowne krzyżowanie całej partii nie jest tańsze
+        for _ in range(self.max_attempts):
+            _, first = np.unique(row_hashes(population), return_index=True)
+            duplicate = np.ones(len(population), dtype=bool)
+            duplicate[first] = False
+            duplicate[:protected] = False
+            rows = np.flatnonzero(duplicate)
+            if not len(rows):
+                return
+            self.duplicates += len(rows)
+            block = population[rows]
+            mutate_batch(np_rng, block, 1.0)
+            population[rows] = block
+
+    def restart_rows(self, population, protected, np_rng):
+        count = self.restart_count(len(population), protected)
+        if count:
+            population[len(population) - count:] = init_population(np_rng, count, population.shape[1])
+
+    def state(self):
+        return {"unique_genomes": self.unique_genomes, "unique_fitness": self.unique_fitness,
+                "duplicates": self.duplicates, "restarts": self.restarts, "cooldown": self._cooldown}
+
+    def restore(self, state):
+        self.unique_genomes = list(state["unique_genomes"])
+        self.unique_fitness = list(state["unique_fitness"])
+        self.duplicates = state["duplicates"]
+        self.restarts = state["restarts"]
+        self._cooldown = state["cooldown"]
+
+    def merge(self, islands):
+        # statystyki wysp: liczniki sumowane, metryki uśrednione po wyspach w każdym pokoleniu
+        # (do najkrótszej historii, tak jak cost_history modelu wysp)
+        islands = [stats for stats in islands if stats is not None]
+        if not islands:
+            return
+        self.unique_genomes = [sum(values) / len(values) for values in zip(*(s["unique_genomes"] for s in islands))]
+        self.unique_fitness = [sum(values) / len(values) for values in zip(*(s["unique_fitness"] for s in islands))]
+        self.duplicates = sum(s["duplicates"] for s in islands)
+        self.restarts = sum(s["restarts"] for s in islands)
+
+    def to_dict(self):
+        return {"unique_genomes": self.unique_genomes, "unique_fitness": self.unique_fitness,
+                "duplicates": self.duplicates, "restarts": self.restarts}
@@ -0,0 +1,347 @@
+from bisect import bisect_left, bisect_right
+from itertools import compress
+from operator import ne
+from time import perf_counter
+
+from local_search import improve_solution
+from two_opt import optimize_route_2opt
+
+
+def calculate_routes(client_ids, instance):
+    dist_matrix = instance.dist_rows
+    compat = instance.compat_rows
+    demands = instance.demands
+    ready_times = instance.ready_times
+    due_dates = instance.due_dates
+    service_times = instance.service_times
+    capacity = instance.capacity
+
+    routes = []
+    current_route = [] 
+    current_load = 0
+    current_time = 0.0
+    prev_id = 0
+
+    depot_due = due_dates[0]
+    total_dist = 0.0 
+
+    for client_id in client_ids:
+        demand = demands[client_id]
+        ready_time = ready_times[client_id]
+
+        dist_from_prev = dist_matrix[prev_id][client_id]
+        arrival_time = current_time + dist_from_prev
+
+        start_service = max(arrival_time, ready_time)
+        finish_time = start_service + service_times[client_id]
+
+        dist_home = dist_matrix[client_id][0]
+        arrival_at_depot = finish_time + dist_home
+
+        is_feasible = True
+
+        if not compat[prev_id][client_id]:
+            is_feasible = False
+
+        elif current_load + demand > capacity:
+            is_feasible = False
+
+        elif arrival_time > due_dates[client_id]:
+            is_feasible = False
+
+        elif arrival_at_depot > depot_due:
+            is_feasible = False
+
+        if is_feasible:
+            current_route.append(client_id)
+            current_load += demand
+            current_time = finish_time
+            prev_id = client_id
+            total_dist += dist_from_prev
+        else:
+            if current_route:
+                return_dist = dist_matrix[prev_id][0]
+                total_dist += return_dist
+                routes.append(current_route)
+
+            current_route = [client_id] 
+            current_load = demand
+
+            dist_from_depot = dist_matrix[0][client_id]
+            total_dist += dist_from_depot
+
+            arrival_time = 0.0 + dist_from_depot
+            start_service = max(arrival_time, ready_time)
+            current_time = start_service + service_times[client_id]
+            prev_id = client_id
+
+    if current_route:
+        return_dist = dist_matrix[prev_id][0]
+        total_dist += return_dist
+        routes.append(current_route)
+
+    return routes, total_dist
+
+def calculate_fitness(num_vehicles, distance):
+    return (num_vehicles * 2000) + distance
+
+
+def split_routes(client_ids, instance):
+    # Split Prinsa: najkrótsza ścieżka w DAG-u nad permutacją, łuk (i, j) to trasa
+    # client_ids[i..j] o koszcie calculate_fitness(1, długość). Przedłużanie trasy
+    # kończy się na pierwszym przekroczeniu pojemności lub okna czasowego.
+    dist_matrix = instance.dist_rows
+    compat = instance.compat_rows
+    demands = instance.demands
+    ready_times = instance.ready_times
+    due_dates = instance.due_dates
+    service_times = instance.service_times
+    capacity = instance.capacity
+    depot_due = due_dates[0]
+
+    n = len(client_ids)
+    best = [0.0] + [float('inf')] * n
+    best_dist = [0.0] * (n + 1)
+    pred = [0] * (n + 1)
+
+    for i in range(n):
+        base = best[i]
+        current_load = 0
+        current_time = 0.0
+        route_dist = 0.0
+        prev_id = 0
+
+        for j in range(i, n):
+            client_id = client_ids[j]
+            if not compat[prev_id][client_id]:
+                break
+            dist_from_prev = dist_matrix[prev_id][client_id]
+            arrival_time = current_time + dist_from_prev
+            current_time = max(arrival_time, ready_times[client_id]) + service_times[client_id]
+            current_load += demands[client_id]
+            route_dist += dist_from_prev
+            dist_home = dist_matrix[client_id][0]
+
+            is_feasible = (current_load <= capacity and arrival_time <= due_dates[client_id]
+                           and current_time + dist_home <= depot_due)
+
+            # pojedynczy klient zawsze dostaje trasę, tak jak w calculate_routes
+            if is_feasible or j == i:
+                cost = base + calculate_fitness(1, route_dist + dist_home)
+                if cost < best[j + 1]:
+                    best[j + 1] = cost
+                    best_dist[j + 1] = best_dist[i] + route_dist + dist_home
+                    pred[j + 1] = i
+
+            if not is_feasible:
+                break
+            prev_id = client_id
+
+    routes = []
+    j = n
+    while j > 0:
+        i = pred[j]
+        routes.append(list(client_ids[i:j]))
+        j = i
+    routes.reverse()
+
+    return routes, best_dist[n]
+
+
+def greedy_route_starts(client_ids, instance, ref_ids=None, ref_starts=None):
+    # Te same decyzje co calculate_routes, ale wynikiem są pozycje początków tras.
+    # Z genomem referencyjnym: trasa zaczynająca się tam, gdzie w referencji, na
+    # niezmienionym fragmencie genomu, daje te same trasy aż do trasy obejmującej
+    # pozycję przed następną zmianą - te początki są przepisywane bez symulacji.
+    # Referencję podaje wołający, tylko gdy worth_reference() - inaczej koszt szukania zmian się nie zwraca.
+    dist_matrix = instance.dist_rows
+    compat = instance.compat_rows
+    demands = instance.demands
+    ready_times = instance.ready_times
+    due_dates = instance.due_dates
+    service_times = instance.service_times
+    capacity = instance.capacity
+    depot_due = due_dates[0]
+
+    n = len(client_ids)
+    changed = None
+    if ref_starts is not None:
+        changed = list(compress(range(n), map(ne, client_ids, ref_ids)))
+        if not changed:
+            return list(ref_starts)
+        ref_index = {start: r for r, start in enumerate(ref_starts)}
+
+    starts = []
+    k = 0
+    while k < n:
+        if changed is not None and k in ref_index:
+            c = bisect_left(changed, k)
+            if c == len(changed):
+                starts.extend(ref_starts[ref_index[k]:])
+                return starts
+            if changed[c] > k:
+                r = bisect_right(ref_starts, changed[c] - 1) - 1
+                starts.extend(ref_starts[ref_index[k]:r])
+                k = ref_starts[r]
+
+        starts.append(k)
+        client_id = client_ids[k]
+        current_load = demands[client_id]
+        current_time = max(dist_matrix[0][client_id], ready_times[client_id]) + service_times[client_id]
+        prev_id = client_id
+        k += 1
+
+        while k < n:
+            client_id = client_ids[k]
+            if not compat[prev_id][client_id]:
+                break
+            demand = demands[client_id]
+            arrival_time = current_time + dist_matrix[prev_id][client_id]
+            finish_time = max(arrival_time, ready_times[client_id]) + service_times[client_id]
+
+            if (current_load + demand > capacity or arrival_time > due_dates[client_id]
+                    or finish_time + dist_matrix[client_id][0] > depot_due):
+                break
+
+            current_load += demand
+            current_time = finish_time
+            prev_id = client_id
+            k += 1
+
+    return starts
+
+
+def worth_reference(kept, size):
+    # kept - pozycje, na których potomek ma geny rodzica; przy mniej niż połowie przeskoki
+    # po początkach tras rodzica prawie nie występują
+    return 2 * kept >= size
+
+
+def routes_from_starts(client_ids, starts):
+    ends = starts[1:] + [len(client_ids)]
+    return [list(client_ids[s:e]) for s, e in zip(starts, ends)]
+
+
+def decode_incremental(genome, instance, decode_cache, reference=None):
+    # tylko dekoder greedy: potomek OX nie dzieli z żadnym rodzicem prefiksu, od którego
+    # split mógłby przejąć etykiety, a segment rodzica na tych samych pozycjach umie wykorzystać
+    # tylko greedy (przeskoki między początkami tras)
+    ref_starts = decode_cache.get(tuple(reference)) if reference is not None else None
+    if ref_starts is None:
+        starts = greedy_route_starts(genome, instance)
+    else:
+        starts = greedy_route_starts(genome, instance, reference, ref_starts)
+    decode_cache.put(tuple(genome), starts)
+    return routes_from_starts(genome, starts)
+
+
+DECODERS = {"greedy": calculate_routes, "split": split_routes}
+
+
+def check_route(route_ids, instance):
+    dist_matrix = instance.dist_rows
+    demands = instance.demands
+    ready_times = instance.ready_times
+    due_dates = instance.due_dates
+    service_times = instance.service_times
+    capacity = instance.capacity
+
+    current_time = 0.0
+    current_load = 0
+    total_dist = 0.0
+    prev_id = 0 
+
+    for client_id in route_ids:
+        demand = demands[client_id]
+
+        if current_load + demand > capacity:
+            return False, 0.0, "Przeciążenie"
+
+        dist = dist_matrix[prev_id][client_id]
+        total_dist += dist
+        arrival_time = current_time + dist
+
+        if arrival_time > due_dates[client_id]:
+            return False, 0.0, "Spóźnienie"
+
+        start_service = max(arrival_time, ready_times[client_id])
+
+        current_time = start_service + service_times[client_id]
+        current_load += demand
+        prev_id = client_id
+
+    dist_home = dist_matrix[prev_id][0]
+    total_dist += dist_home
+    arrival_at_depot = current_time + dist_home
+
+    if arrival_at_depot > due_dates[0]:
+        return False, 0.0, "Spóźniony powrót"
+
+    return True, total_dist, "OK"
+
+def optimize_route_cached(route, instance, route_cache, profiler=None):
+    key = tuple(route)
+    cached = route_cache.get(key)
+    if cached is not None:
+        return list(cached[0]), cached[1]
+
+    if profiler is not None:
+        start = perf_counter()
+
+    if len(route) > 2:
+        opt_route, opt_dist = optimize_route_2opt(route, instance, profiler=profiler)
+    else:
+        _, opt_dist, _ = check_route(route, instance)
+        opt_route = route
+
+    if profiler is not None:
+        profiler.add_time("two_opt", perf_counter() - start)
+        profiler.count("two_opt_calls" if len(route) > 2 else "check_route_calls")
+
+    route_cache.put(key, (tuple(opt_route), opt_dist))
+    return list(opt_route), opt_dist
+
+
+def decode(genome, instance, decoder, decode_cache=None, reference=None):
+    if decode_cache is None:
+        return DECODERS[decoder](genome, instance)[0]
+    return decode_incremental(genome, instance, decode_cache, reference)
+
+
+def evaluate_genome(genome, instance, genome_cache, route_cache, decoder="greedy", profiler=None,
+                    decode_cache=None, reference=None, local_search=False):
+    key = tuple(genome)
+    cached = genome_cache.get(key)
+    if cached is not None:
+        return cached
+
+    if profiler is None:
+        raw_routes = decode(genome, instance, decoder, decode_cache, reference)
+    else:
+        start = perf_counter()
+        raw_routes = decode(genome, instance, decoder, decode_cache, reference)
+        profiler.add_time("decode", perf_counter() - start)
+        profiler.count("decode_calls")
+
+    optimized_routes = []
+    total_optimized_dist = 0.0
+    for route in raw_routes:
+        opt_route, opt_dist = optimize_route_cached(route, instance, route_cache, profiler)
+        optimized_routes.append(opt_route)
+        total_optimized_dist += opt_dist
+
+    # edukacja: przeszukiwanie międzytrasowe, wynik wpływa tylko na ocenę genomu
+    if local_search:
+        if profiler is not None:
+            start = perf_counter()
+        optimized_routes, total_optimized_dist = improve_solution(
+            optimized_routes, instance, vehicle_cost=calculate_fitness(1, 0.0))
+        if profiler is not None:
+            profiler.add_time("local_search", perf_counter() - start)
+
+    num_vehicles = len(optimized_routes)
+    fitness = calculate_fitness(num_vehicles, total_optimized_dist)
+
+    result = (fitness, num_vehicles, total_optimized_dist)
+    genome_cache.put(key, result)
+    return result
@@ -0,0 +1,74 @@
+import numpy as np
+
+from distance import BLOCK_ROWS, ROW_CACHE, prepare_distance
+
+
+def time_window_bounds(depot_dist, ready_time, due_date, service_time):
+    # najwcześniejszy możliwy i najpóźniejszy dopuszczalny początek obsługi klienta,
+    # przy wyjeździe z depotu w chwili 0 i powrocie przed zamknięciem depotu
+    # (odległości euklidesowe są symetryczne - wystarcza wiersz depotu)
+    earliest = np.maximum(ready_time, depot_dist)
+    latest = np.minimum(due_date, due_date[0] - depot_dist - service_time)
+    earliest[0] = ready_time[0]
+    latest[0] = due_date[0]
+    return earliest, latest
+
+
+def compatibility_matrix(block, earliest, latest, service_time):
+    # compat[i, j] - j może być obsłużony bezpośrednio po i w jakiejkolwiek wykonalnej trasie;
+    # tolerancja tylko poszerza macierz, więc odrzucone pary są na pewno niewykonalne.
+    # Liczona blokami wierszy, żeby nie tworzyć pełnej macierzy odległości float64.
+    n = len(earliest)
+    compat = np.empty((n, n), dtype=bool)
+    for start in range(0, n, BLOCK_ROWS):
+        stop = min(n, start + BLOCK_ROWS)
+        compat[start:stop] = ((earliest[start:stop, None] + service_time[start:stop, None] + block(start, stop))
+                              <= latest[None, :] + 1e-9)
+    compat[0, :] = True
+    compat[:, 0] = True
+    return compat
+
+
+class Instance:
+    def __init__(self, capacity, x, y, demand, ready_time, due_date, service_time, name=None, dist=None,
+                 vehicles=None, distance="list", row_cache=ROW_CACHE, compat=None):
+        self.name = name
+        self.capacity = capacity
+        self.vehicles = vehicles
+
+        self.x = np.ascontiguousarray(x, dtype=np.float64)
+        self.y = np.ascontiguousarray(y, dtype=np.float64)
+        self.demand = np.ascontiguousarray(demand, dtype=np.int64)
+        self.ready_time = np.ascontiguousarray(ready_time, dtype=np.float64)
+        self.due_date = np.ascontiguousarray(due_date, dtype=np.float64)
+        self.service_time = np.ascontiguousarray(service_time, dtype=np.float64)
+        # dist - macierz backendu (None dla "compute"), dist_rows - wiersze jako listy,
+        # distance_block(start, stop) - wiersze [start, stop) jako float64 dla obliczeń NumPy
+        self.distance = distance
+        self.dist, self.dist_rows, self.distance_block = prepare_distance(self.x, self.y, dist, distance, row_cache)
+
+        # Kopie w listach dla pętli w czystym Pythonie - skalarne indeksowanie ndarray
+        # jest tam wolniejsze niż indeksowanie listy.
+        self.demands = self.demand.tolist()
+        self.ready_times = self.ready_time.tolist()
+        self.due_dates = self.due_date.tolist()
+        self.service_times = self.service_time.tolist()
+
+        self.earliest, self.latest = time_window_bounds(self.distance_block(0, 1)[0], self.ready_time, self.due_date,
+                                                        self.service_time)
+        # compat podany z zewnątrz (np. z pamięci współdzielonej w procesie roboczym) nie jest liczony ponownie
+        if compat is None:
+            compat = compatibility_matrix(self.distance_block, self.earliest, self.latest, self.service_time)
+        self.compat = compat
+        # wiersze jako bytes: 1 bajt na parę, szybkie indeksowanie w pętlach
+        self.compat_rows = [row.tobytes() for row in self.compat.view(np.uint8)]
+
+        # listy sąsiadów wg k, wypełniane przez local_search.build_neighbors
+        self.neighbors = {}
+
+    def __len__(self):
+        return len(self.x)
+
+    def __repr__(self):
+        return f"Instance: {self.name} | Klienci: {len(self.x) - 1} | Pojemność: {self.capacity}"
+
@@ -0,0 +1,157 @@
+import time
+from multiprocessing import Event, Process, Queue
+from queue import Empty
+from random import Random
+
+from cache import LRUCache
+from diversity import DiversityControl
+from parallel import SharedInstance, attach_instance
+from seeding import make_rngs, seed_sequence
+from stopping import STOP_EXTERNAL, STOP_GENERATIONS, StoppingCriteria
+
+MIGRATION_TIMEOUT = 600
+
+
+def migration_targets(num_islands, epoch, topology, base_seed):
+    if topology == "ring":
+        return [(k + 1) % num_islands for k in range(num_islands)]
+
+    # losowa permutacja bez punktów stałych, identyczna na każdej wyspie dla danej epoki
+    rng = Random(f"{base_seed}-{epoch}")
+    while True:
+        targets = list(range(num_islands))
+        rng.shuffle(targets)
+        if all(targets[k] != k for k in range(num_islands)):
+            return targets
+
+
+class IslandStopping(StoppingCriteria):
+    # pierwsza wyspa, która spełni kryterium, zatrzymuje wszystkie pozostałe
+    def __init__(self, params, stop_event):
+        StoppingCriteria.__init__(self, params.time_limit, params.stall_generations, params.target_fitness,
+                                  params.bks, params.target_gap)
+        self.stop_event = stop_event
+
+    def check(self, best_fitness, best_vehicles, best_distance):
+        reason = StoppingCriteria.check(self, best_fitness, best_vehicles, best_distance)
+        if reason is not None:
+            self.stop_event.set()
+        elif self.stop_event.is_set():
+            self.reason = reason = STOP_EXTERNAL
+        return reason
+
+
+def _island(k, spec, params, island_seq, base_seed, inboxes, results, stop_event):
+    from solver import run_genetic_algorithm
+
+    rng, np_rng = make_rngs(island_seq)
+    instance, blocks = attach_instance(spec)
+    num_islands = len(inboxes)
+    stopping = IslandStopping(params, stop_event)
+    # migranci z przyszłych epok od wyspy, która jest do przodu - czekają na swoją epokę
+    early = {}
+
+    def migrate(gen, scored_population):
+        done = gen + 1
+        if done % params.migration_interval != 0 or done >= params.generations:
+            return []
+
+        epoch = done // params.migration_interval
+        target = migration_targets(num_islands, epoch, params.topology, base_seed)[k]
+        migrants = [genome[:] for _, genome, _, _ in scored_population[:params.migrants]]
+        inboxes[target].put((epoch, migrants))
+
+        if epoch in early:
+            return early.pop(epoch)
+
+        # zatrzymana wyspa nie wyśle już migrantów - wtedy pokolenie kończy się bez nich
+        deadline = time.monotonic() + MIGRATION_TIMEOUT
+        while True:
+            try:
+                message_epoch, immigrants = inboxes[k].get(timeout=0.1)
+            except Empty:
+                if stop_event.is_set():
+                    return []
+                if time.monotonic() > deadline:
+                    raise
+                continue
+            if message_epoch == epoch:
+                return immigrants
+            early[message_epoch] = immigrants
+
+    diversity = DiversityControl.from_params(params)
+    try:
+        best_genome, best_vehicles, cost_history = run_genetic_algorithm(
+            instance, params.population_size, params.generations, params.tournament_size, params.mutation_rate,
+            LRUCache(params.cache_size), LRUCache(params.route_cache_size), verbose=False, decoder=params.decoder,
+            migrate=migrate, incremental=params.incremental, local_search=params.local_search == "educate",
+            stopping=stopping, engine=params.engine, rng=rng, np_rng=np_rng,
+            diversity=diversity)
+        results.put((k, best_genome, best_vehicles, cost_history, stopping.reason,
+                     diversity.to_dict() if diversity is not None else None, None))
+    except Exception as e:
+        results.put((k, None, None, None, None, None, f"{type(e).__name__}: {e}"))
+
+
+def run_islands(instance, params, evaluate, stopping=None, seq=None, diversity=None):
+    num_islands = params.islands
+    # każda wyspa dostaje potomną sekwencję - niezależne strumienie, odtwarzalne z ziarna przebiegu
+    if seq is None:
+        seq = seed_sequence(params.seed, params.spawn_key)
+    island_seqs = seq.spawn(num_islands)
+
+    shared = SharedInstance(instance)
+    inboxes = [Queue() for _ in range(num_islands)]
+    results = Queue()
+    stop_event = Event()
+
+    processes = [
+        Process(target=_island, args=(k, shared.spec, params, island_seqs[k], seq.entropy, inboxes, results, stop_event))
+        for k in range(num_islands)
+    ]
+
+    try:
+        for p in processes:
+            p.start()
+
+        outcomes = {}
+        while len(outcomes) < num_islands:
+            try:
+                k, best_genome, best_vehicles, cost_history, reason, island_diversity, error = results.get(timeout=1)
+            except Empty:
+                if any(p.exitcode not in (None, 0) for p in processes):
+                    raise RuntimeError("Proces wyspy zakończył się błędem")
+                continue
+            if error is not None:
+                raise RuntimeError(f"Wyspa {k}: {error}")
+            outcomes[k] = (best_genome, best_vehicles, cost_history, reason, island_diversity)
+
+        for p in processes:
+            p.join()
+    finally:
+        for p in processes:
+            if p.is_alive():
+                p.terminate()
+        shared.close()
+
+    # globalny najlepszy - wyspy oceniane tą samą funkcją celu
+    best_genome = None
+    best_fitness = float('inf')
+    best_vehicles = None
+    for k in range(num_islands):
+        genome, vehicles = outcomes[k][:2]
+        fitness = evaluate(genome)[0]
+        if fitness < best_fitness:
+            best_fitness, best_genome, best_vehicles = fitness, genome, vehicles
+
+    histories = [outcomes[k][2] for k in range(num_islands)]
+    cost_history = [min(values) for values in zip(*histories)]
+
+    if stopping is not None:
+        reasons = [outcomes[k][3] for k in range(num_islands)]
+        stopping.reason = next((r for r in reasons if r not in (STOP_GENERATIONS, STOP_EXTERNAL)), STOP_GENERATIONS)
+
+    if diversity is not None:
+        diversity.merge([outcomes[k][4] for k in range(num_islands)])
+
+    return best_genome, best_vehicles, cost_history
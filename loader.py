@@ -0,0 +1,129 @@
+import os
+
+import numpy as np
+
+from distance import ROW_CACHE, create_distance_matrix, open_distance_matrix
+from instance import Instance
+
+# Format Solomona i Gehringa-Hombergera (200-1000 klientów) jest ten sam: nazwa,
+# sekcja VEHICLE z liczbą pojazdów i pojemnością, potem tabela klientów po "CUST NO.".
+# Sparsowana instancja i macierz odległości trafiają do <plik>.npz / <plik>.dist.npy
+# obok źródła; macierz jest otwierana przez mmap, więc procesy współdzielą strony.
+CACHE_VERSION = 1
+COLUMNS = 7
+
+
+def cache_paths(filename):
+    stem = os.path.splitext(filename)[0]
+    return stem + ".npz", stem + ".dist.npy"
+
+
+def parse_instance_file(filename):
+    with open(filename) as f:
+        text = f.read()
+
+    lines = text.splitlines()
+    name = lines[0].strip() if lines else ""
+    vehicles = 0
+    capacity = 0
+    header = None
+    for i, line in enumerate(lines):
+        if "CAPACITY" in line and "NUMBER" in line:
+            parts = lines[i + 1].split()
+            if len(parts) >= 2:
+                vehicles = int(parts[0])
+                capacity = int(parts[1])
+        elif "CUST NO." in line:
+            header = i
+            break
+    if header is None:
+        raise ValueError(f"Brak tabeli klientów (CUST NO.) w pliku {filename}")
+
+    # cała tabela naraz: tokeny -> jedna tablica (klienci x 7)
+    table = np.array(" ".join(lines[header + 1:]).split(), dtype=np.float64)
+    if len(table) % COLUMNS:
+        raise ValueError(f"Niepełny wiersz klienta w pliku {filename}")
+    data = table_arrays(table.reshape(-1, COLUMNS))
+    data.update(name=name, vehicles=vehicles, capacity=capacity)
+    return data
+
+
+def table_arrays(table):
+    # wiersze klientów [nr, x, y, zapotrzebowanie, gotowość, termin, obsługa] -> kolumny
+    table = np.asarray(table, dtype=np.float64)
+    return {
+        "x": table[:, 1],
+        "y": table[:, 2],
+        "demand": table[:, 3].astype(np.int64),
+        "ready_time": table[:, 4],
+        "due_date": table[:, 5],
+        "service_time": table[:, 6]
+    }
+
+
+def _source_stamp(filename):
+    stat = os.stat(filename)
+    return np.array([CACHE_VERSION, stat.st_mtime_ns, stat.st_size], dtype=np.int64)
+
+
+def _read_cache(filename):
+    npz_path, dist_path = cache_paths(filename)
+    if not os.path.exists(npz_path) or not os.path.exists(dist_path):
+        return None
+    with np.load(npz_path) as cached:
+        if not np.array_equal(cached["stamp"], _source_stamp(filename)):
+            return None
+        data = {key: cached[key] for key in cached.files if key != "stamp"}
+    data["name"] = str(data["name"])
+    data["vehicles"] = int(data["vehicles"])
+    data["capacity"] = int(data["capacity"])
+    data["dist"] = open_distance_matrix(dist_path)
+    return data
+
+
+def _write_atomic(path, write):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        write(f)
+    os.replace(tmp_path, path)
+
+
+def _write_cache(filename, data):
+    npz_path, dist_path = cache_paths(filename)
+    arrays = {key: value for key, value in data.items() if key != "dist"}
+    try:
+        _write_atomic(dist_path, lambda f: np.save(f, data["dist"]))
+        _write_atomic(npz_path, lambda f: np.savez(f, stamp=_source_stamp(filename), **arrays))
+    except OSError:
+        # katalog tylko do odczytu - działamy bez cache
+        return False
+    return True
+
+
+def read_instance_data(filename, use_cache=True):
+    data = _read_cache(filename) if use_cache else None
+    if data is None:
+        data = parse_instance_file(filename)
+        data["dist"] = create_distance_matrix(data["x"], data["y"])
+        # świeżo zapisana macierz otwierana z pliku - pierwsze wczytanie zachowuje się jak kolejne
+        if use_cache and _write_cache(filename, data):
+            data["dist"] = open_distance_matrix(cache_paths(filename)[1])
+    return data
+
+
+def load_instance(filename, verbose=True, use_cache=True, distance="list", row_cache=ROW_CACHE):
+    data = read_instance_data(filename, use_cache)
+    if distance == "mmap" and not isinstance(data["dist"], np.memmap):
+        raise ValueError(f"Backend mmap wymaga pliku {cache_paths(filename)[1]} "
+                         f"(cache wyłączony albo katalog tylko do odczytu)")
+    if verbose:
+        print(f"Znaleziono pojemność pojazdu: {data['capacity']} (pojazdów: {data['vehicles']})")
+        print(f"Wczytano {len(data['x'])} punktów (1 Depot + {len(data['x']) - 1} Klientów).")
+    return Instance(data["capacity"], data["x"], data["y"], data["demand"], data["ready_time"], data["due_date"],
+                    data["service_time"], name=filename, dist=data["dist"], vehicles=data["vehicles"],
+                    distance=distance, row_cache=row_cache)
+
+
+def load_points(filename):
+    data = read_instance_data(filename)
+    return list(zip(data["x"].tolist(), data["y"].tolist()))
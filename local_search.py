@@ -0,0 +1,246 @@
+import numpy as np
+
+from distance import BLOCK_ROWS
+
+MOVE_EPS = 0.01
+OR_OPT_MAX = 3
+
+
+def build_neighbors(instance, k=20):
+    # k najbliższych klientów, z którymi para może być kolejna w trasie (w którąkolwiek stronę)
+    if k in instance.neighbors:
+        return instance.neighbors[k]
+
+    n = len(instance)
+    reachable = instance.compat | instance.compat.T
+    neighbors = [[]]
+    for start in range(1, n, BLOCK_ROWS):
+        stop = min(n, start + BLOCK_ROWS)
+        masked = np.where(reachable[start:stop], instance.distance_block(start, stop), np.inf)
+        masked[np.arange(stop - start), np.arange(start, stop)] = np.inf
+        masked[:, 0] = np.inf
+
+        order = np.argsort(masked, axis=1, kind="stable")[:, :k]
+        for row in range(stop - start):
+            neighbors.append([int(j) for j in order[row] if np.isfinite(masked[row, j])])
+
+    instance.neighbors[k] = neighbors
+    return neighbors
+
+
+class RouteData:
+    # p - trasa z depotem na obu końcach, dep - najwcześniejszy wyjazd, lat - najpóźniejszy
+    # dopuszczalny przyjazd, loadf - ładunek po obsłużeniu p[k]
+    __slots__ = ("p", "dep", "lat", "loadf", "dist")
+
+    def __init__(self, route, instance):
+        dist_matrix = instance.dist_rows
+        ready_times = instance.ready_times
+        due_dates = instance.due_dates
+        service_times = instance.service_times
+        demands = instance.demands
+
+        p = [0] + route + [0]
+        n = len(p)
+        dep = [0.0] * n
+        lat = [0.0] * n
+        loadf = [0] * n
+
+        current_time = 0.0
+        load = 0
+        total = 0.0
+        for k in range(1, n):
+            c = p[k]
+            d = dist_matrix[p[k - 1]][c]
+            total += d
+            current_time = max(current_time + d, ready_times[c]) + service_times[c]
+            load += demands[c]
+            dep[k] = current_time
+            loadf[k] = load
+
+        lat[n - 1] = due_dates[0]
+        for k in range(n - 2, -1, -1):
+            c = p[k]
+            lat[k] = min(due_dates[c], lat[k + 1] - dist_matrix[c][p[k + 1]] - service_times[c])
+
+        self.p = p
+        self.dep = dep
+        self.lat = lat
+        self.loadf = loadf
+        self.dist = total
+
+    @property
+    def load(self):
+        return self.loadf[-1]
+
+    @property
+    def size(self):
+        return len(self.p) - 2
+
+
+class LocalSearch:
+    def __init__(self, instance, neighbors=20, vehicle_cost=2000, max_passes=50):
+        self.instance = instance
+        self.neighbors = build_neighbors(instance, neighbors)
+        self.vehicle_cost = vehicle_cost
+        self.max_passes = max_passes
+
+        self.dist_matrix = instance.dist_rows
+        self.compat = instance.compat_rows
+        self.ready_times = instance.ready_times
+        self.due_dates = instance.due_dates
+        self.service_times = instance.service_times
+        self.demands = instance.demands
+        self.capacity = instance.capacity
+
+    def _fits(self, prev, dep_prev, seq, nxt, lat_next):
+        dist_matrix = self.dist_matrix
+        compat = self.compat
+        current_time = dep_prev
+        last = prev
+        for c in seq:
+            if not compat[last][c]:
+                return False
+            arrival_time = current_time + dist_matrix[last][c]
+            if arrival_time > self.due_dates[c]:
+                return False
+            current_time = max(arrival_time, self.ready_times[c]) + self.service_times[c]
+            last = c
+        if not compat[last][nxt]:
+            return False
+        return current_time + dist_matrix[last][nxt] <= lat_next
+
+    def _reindex(self, r):
+        p = self.data[r].p
+        for k in range(1, len(p) - 1):
+            self.route_of[p[k]] = r
+            self.pos_of[p[k]] = k
+
+    def _set_route(self, r, route):
+        self.data[r] = RouteData(route, self.instance)
+        self._reindex(r)
+
+    def _try_or_opt(self, u, v):
+        # przeniesienie segmentu 1..3 klientów zaczynającego się od u przed lub za v
+        D = self.dist_matrix
+        r1, a = self.route_of[u], self.pos_of[u]
+        r2, b = self.route_of[v], self.pos_of[v]
+        if r1 == r2:
+            return False
+        R1, R2 = self.data[r1], self.data[r2]
+        p1, p2 = R1.p, R2.p
+
+        for length in range(1, OR_OPT_MAX + 1):
+            end = a + length
+            if end > len(p1) - 1:
+                break
+            seg_load = R1.loadf[end - 1] - R1.loadf[a - 1]
+            if R2.load + seg_load > self.capacity:
+                break
+
+            first, last = p1[a], p1[end - 1]
+            before, after = p1[a - 1], p1[end]
+            if R1.dep[a - 1] + D[before][after] > R1.lat[end]:
+                continue
+
+            removal = D[before][after] - D[before][first] - D[last][after]
+            if length == R1.size:
+                removal -= self.vehicle_cost
+
+            for x in (b - 1, b):
+                y = x + 1
+                delta = removal + D[p2[x]][first] + D[last][p2[y]] - D[p2[x]][p2[y]]
+                if delta >= -MOVE_EPS:
+                    continue
+                segment = p1[a:end]
+                if not self._fits(p2[x], R2.dep[x], segment, p2[y], R2.lat[y]):
+                    continue
+
+                self._set_route(r1, p1[1:a] + p1[end:-1])
+                self._set_route(r2, p2[1:x + 1] + segment + p2[y:-1])
+                return True
+        return False
+
+    def _try_swap(self, u, v):
+        D = self.dist_matrix
+        r1, a = self.route_of[u], self.pos_of[u]
+        r2, b = self.route_of[v], self.pos_of[v]
+        if r1 == r2:
+            return False
+        R1, R2 = self.data[r1], self.data[r2]
+        p1, p2 = R1.p, R2.p
+
+        diff = self.demands[v] - self.demands[u]
+        if R1.load + diff > self.capacity or R2.load - diff > self.capacity:
+            return False
+
+        delta = (D[p1[a - 1]][v] + D[v][p1[a + 1]] - D[p1[a - 1]][u] - D[u][p1[a + 1]]
+                 + D[p2[b - 1]][u] + D[u][p2[b + 1]] - D[p2[b - 1]][v] - D[v][p2[b + 1]])
+        if delta >= -MOVE_EPS:
+            return False
+        if not self._fits(p1[a - 1], R1.dep[a - 1], (v,), p1[a + 1], R1.lat[a + 1]):
+            return False
+        if not self._fits(p2[b - 1], R2.dep[b - 1], (u,), p2[b + 1], R2.lat[b + 1]):
+            return False
+
+        self._set_route(r1, p1[1:a] + [v] + p1[a + 1:-1])
+        self._set_route(r2, p2[1:b] + [u] + p2[b + 1:-1])
+        return True
+
+    def _try_two_opt_star(self, u, v):
+        # nowa krawędź u -> v: ogon trasy v przechodzi za u, ogon trasy u za poprzednika v
+        D = self.dist_matrix
+        r1, a = self.route_of[u], self.pos_of[u]
+        r2, b = self.route_of[v], self.pos_of[v]
+        if r1 == r2:
+            return False
+        R1, R2 = self.data[r1], self.data[r2]
+        p1, p2 = R1.p, R2.p
+        prev_v, next_u = p2[b - 1], p1[a + 1]
+
+        if R1.loadf[a] + R2.load - R2.loadf[b - 1] > self.capacity:
+            return False
+        if R2.loadf[b - 1] + R1.load - R1.loadf[a] > self.capacity:
+            return False
+
+        delta = D[u][v] + D[prev_v][next_u] - D[u][next_u] - D[prev_v][v]
+        if b == 1 and a == len(p1) - 2:
+            delta -= self.vehicle_cost
+        if delta >= -MOVE_EPS:
+            return False
+        if not self.compat[u][v] or not self.compat[prev_v][next_u]:
+            return False
+        if R1.dep[a] + D[u][v] > R2.lat[b]:
+            return False
+        if R2.dep[b - 1] + D[prev_v][next_u] > R1.lat[a + 1]:
+            return False
+
+        self._set_route(r1, p1[1:a + 1] + p2[b:-1])
+        self._set_route(r2, p2[1:b] + p1[a + 1:-1])
+        return True
+
+    def improve(self, routes):
+        n = len(self.instance)
+        self.route_of = [0] * n
+        self.pos_of = [0] * n
+        self.data = []
+        for r, route in enumerate(routes):
+            self.data.append(RouteData(list(route), self.instance))
+            self._reindex(r)
+
+        for _ in range(self.max_passes):
+            improved = False
+            for u in range(1, n):
+                for v in self.neighbors[u]:
+                    if self._try_or_opt(u, v) or self._try_swap(u, v) or self._try_two_opt_star(u, v):
+                        improved = True
+                        break
+            if not improved:
+                break
+
+        result = [R.p[1:-1] for R in self.data if R.size > 0]
+        return result, sum(R.dist for R in self.data)
+
+
+def improve_solution(routes, instance, neighbors=20, vehicle_cost=2000):
+    return LocalSearch(instance, neighbors, vehicle_cost).improve(routes)
@@ -0,0 +1,104 @@
+from multiprocessing import Pool, shared_memory
+
+import numpy as np
+
+from cache import ROUTE_CACHE_SIZE, LRUCache
+from evaluation import evaluate_genome
+from distance import ROW_CACHE, open_distance_matrix
+from instance import Instance
+
+ARRAY_FIELDS = ("x", "y", "demand", "ready_time", "due_date", "service_time", "dist", "compat")
+
+_worker = {}
+
+
+class SharedInstance:
+    def __init__(self, instance):
+        self.blocks = []
+        self.spec = {"capacity": instance.capacity, "name": instance.name, "vehicles": instance.vehicles,
+                     "distance": instance.distance, "dist_path": None, "arrays": {}}
+
+        for field in ARRAY_FIELDS:
+            arr = getattr(instance, field)
+            if field == "dist" and isinstance(arr, np.memmap) and arr.filename:
+                # macierz z pliku - workery otwierają ten sam plik przez mmap zamiast kopii
+                self.spec["dist_path"] = arr.filename
+                continue
+            if arr is None:
+                continue
+            shm = shared_memory.SharedMemory(create=True, size=max(arr.nbytes, 1))
+            np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf)[...] = arr
+            self.blocks.append(shm)
+            self.spec["arrays"][field] = (shm.name, arr.shape, arr.dtype.str)
+
+    def close(self):
+        for shm in self.blocks:
+            shm.close()
+            shm.unlink()
+        self.blocks = []
+
+
+def attach_instance(spec):
+    blocks = []
+    arrays = {}
+    for field, (shm_name, shape, dtype) in spec["arrays"].items():
+        shm = shared_memory.SharedMemory(name=shm_name)
+        blocks.append(shm)
+        arrays[field] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+
+    if spec["dist_path"] is not None:
+        arrays["dist"] = open_distance_matrix(spec["dist_path"])
+
+    # macierz z pamięci współdzielonej czytana bez kopii. Backend "list" nie robi w procesie roboczym
+    # dist.tolist() przy starcie: wiersze list powstają na żądanie i zostają w RowCache (bez limitu,
+    # żeby ocena była tak szybka jak na listach). Ograniczoną pamięć na proces daje --distance mmap/float32.
+    distance, row_cache = spec["distance"], ROW_CACHE
+    if distance == "list":
+        distance, row_cache = "mmap", len(arrays["x"])
+    instance = Instance(spec["capacity"], name=spec["name"], vehicles=spec["vehicles"], distance=distance,
+                        row_cache=row_cache, **arrays)
+    return instance, blocks
+
+
+def _init_worker(spec, route_cache_size, decoder, local_search):
+    instance, blocks = attach_instance(spec)
+    _worker["instance"] = instance
+    _worker["blocks"] = blocks
+    # genomy deduplikuje i cache'uje proces główny - do workera trafia każdy genom raz
+    _worker["genome_cache"] = LRUCache(0)
+    _worker["route_cache"] = LRUCache(route_cache_size)
+    _worker["decoder"] = decoder
+    _worker["local_search"] = local_search
+
+
+def _evaluate(genome):
+    return evaluate_genome(genome, _worker["instance"], _worker["genome_cache"], _worker["route_cache"],
+                           _worker["decoder"], local_search=_worker["local_search"])
+
+
+class ParallelEvaluator:
+    def __init__(self, instance, workers, route_cache_size=ROUTE_CACHE_SIZE, decoder="greedy", local_search=False):
+        self.workers = workers
+        self.shared = SharedInstance(instance)
+        try:
+            self.pool = Pool(workers, initializer=_init_worker, initargs=(self.shared.spec, route_cache_size, decoder,
+                                                                        local_search))
+        except Exception:
+            self.shared.close()
+            raise
+
+    def evaluate(self, genomes):
+        # map zachowuje kolejność, więc wynik nie zależy od przydziału do procesów
+        chunksize = max(1, len(genomes) // (self.workers * 4))
+        return self.pool.map(_evaluate, genomes, chunksize)
+
+    def close(self):
+        self.pool.close()
+        self.pool.join()
+        self.shared.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
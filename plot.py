@@ -1,185 +1,139 @@
-import os
+import hashlib
 import json
-import re
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+matplotlib.use("Agg")
+
+import matplotlib.pyplot as plt
 import pandas as pd
 import seaborn as sns
-import matplotlib.pyplot as plt
-from glob import glob
-from client import Client
+from loader import load_points
+from results import ResultStore, dataset_name, import_json_dir
 
-def load_solomon_file(filename):
-    clients = []
-    with open(filename, 'r') as f:
-        lines = f.readlines()
+# zmiana wyglądu wykresów = nowa wersja, wszystkie pliki zostaną przerysowane
+PLOT_VERSION = 1
+MANIFEST = "manifest.json"
+
+NAMES_TITLE = {
+    "pop": "wielkośći populacji",
+    "gen": "generacji",
+    "tour": "rozmiaru turnieju",
+    "mut": "szansy mutacji"
+}
+
+NAMES_X = {
+    "pop": "Rozmiar populacji",
+    "gen": "Ilość generacji",
+    "tour": "Rozmiar turnieju",
+    "mut": "Szansa mutacji"
+}
 
-    start_parsing = False
-    for line in lines:
-        if not line.strip():
-            continue
-        if "CUST NO." in line:
-            start_parsing = True
-            continue
-        if start_parsing:
-            parts = line.split()
-            if len(parts) >= 7:
-                c = Client(
-                    id=int(parts[0]),
-                    x=int(parts[1]),
-                    y=int(parts[2]),
-                    demand=int(parts[3]),
-                    ready_time=int(parts[4]),
-                    due_date=int(parts[5]),
-                    service_time=int(parts[6])
-                )
-                clients.append(c)
-
-    points = [(c.x, c.y) for c in clients]
-    return points
-
-def load_json(file):
-    with open(file) as f:
-        return [json.loads(line) for line in f]
-
-def plot_cost_history(output_dir, datasets_files, baseline_params, filename=None,
-                               title="Długość trasy vs Generacje dla wszystkich datasetów"):
-    all_files = glob(os.path.join(output_dir, "*.json"))
-    
-    plt.figure(figsize=(10,6))
-    
-    for ds_file in datasets_files:
-        ds_name = os.path.splitext(os.path.basename(ds_file))[0]
-
-        baseline_files = [
-            f for f in all_files
-            if ds_name in f
-            and f"pop{baseline_params['population_size']}" in f
-            and f"gen{baseline_params['generations']}" in f
-            and f"tour{baseline_params['tournament_size']}" in f
-            and f"mut{baseline_params['mutation_rate']}" in f
-        ]
-        if not baseline_files:
-            print(f"No baseline files found for {ds_name}")
-            continue
 
-        all_runs = []
-        for f in baseline_files:
-            all_runs.extend(load_json(f))
+def baseline_filters(baseline_params):
+    return {name: baseline_params[name]
+            for name in ("population_size", "generations", "tournament_size", "mutation_rate")}
 
-        best_run = min(all_runs, key=lambda r: r["best_cost"])
-        plt.plot(best_run["history"], label=ds_name)
 
-    plt.xlabel("Generacja")
-    plt.ylabel("Długość trasy")
-    plt.title(title)
-    plt.grid(True)
-    plt.legend()
-    plt.tight_layout()
+def plot_cost_history(histories, filename=None, title="Długość trasy vs Generacje dla wszystkich datasetów"):
+    fig, ax = plt.subplots(figsize=(10, 6))
+
+    for ds_name, history in histories.items():
+        ax.plot(history, label=ds_name)
+
+    ax.set_xlabel("Generacja")
+    ax.set_ylabel("Długość trasy")
+    ax.set_title(title)
+    ax.grid(True)
+    ax.legend()
+    fig.tight_layout()
     if filename:
-        plt.savefig(filename, dpi=200)
-    else:
-        plt.show()
-    plt.close()
+        fig.savefig(filename, dpi=200)
+    plt.close(fig)
 
 
 def draw_multiple_routes(points, routes, filename=None, title="Trasy pojazdów"):
-    plt.figure(figsize=(6,6))
+    fig, ax = plt.subplots(figsize=(6, 6))
     depot = points[0]
 
     for route in routes:
         route_with_depot = [0] + route + [0]
         ordered = [points[i] for i in route_with_depot]
         xs, ys = zip(*ordered)
-        plt.plot(xs, ys, marker="o")
-        plt.scatter(xs, ys)
-
-    plt.scatter(depot[0], depot[1], color='red', s=100, zorder=6, label='Depot')
+        ax.plot(xs, ys, marker="o")
+        ax.scatter(xs, ys)
 
-    plt.title(title)
-    plt.gca().set_aspect("equal")
-    plt.grid(True)
-    plt.tight_layout()
-    plt.savefig(filename, dpi=200)
+    ax.scatter(depot[0], depot[1], color='red', s=100, zorder=6, label='Depot')
 
-def generate_all_baseline_plots(output_dir, datasets_files, baseline_params, plots_dir="plots"):
-    os.makedirs(plots_dir, exist_ok=True)
-    all_files = glob(os.path.join(output_dir, "*.json"))
-
-    for ds_file in datasets_files:
-        ds_name = os.path.splitext(os.path.basename(ds_file))[0]
-        points = load_solomon_file(ds_file)
-
-        baseline_files = [
-            f for f in all_files
-            if ds_name in f
-            and f"pop{baseline_params['population_size']}" in f
-            and f"gen{baseline_params['generations']}" in f
-            and f"tour{baseline_params['tournament_size']}" in f
-            and f"mut{baseline_params['mutation_rate']}" in f
-        ]
-        if not baseline_files:
-            print(f"No baseline files found for {ds_name}")
-            continue
+    ax.set_title(title)
+    ax.set_aspect("equal")
+    ax.grid(True)
+    fig.tight_layout()
+    if filename:
+        fig.savefig(filename, dpi=200)
+    plt.close(fig)
 
-        all_runs = []
-        for f in baseline_files:
-            all_runs.extend(load_json(f))
 
-        plot_cost_history(output_dir, datasets_files, baseline_params,
-                           filename=f"{plots_dir}/all_datasets_cost_history.png")
+def plot_boxplot(data, param, filename=None):
+    fig, ax = plt.subplots(figsize=(8, 6))
+    sns.boxplot(x=param, y="best_cost", hue="dataset", data=pd.DataFrame(data), ax=ax)
 
+    ax.set_title(f"Wpływ {NAMES_TITLE[param]} na długość trasy")
+    ax.set_xlabel(NAMES_X[param])
+    ax.set_ylabel("Długość trasy")
+    ax.legend(title="Dataset")
+    fig.tight_layout()
+    if filename:
+        fig.savefig(filename, dpi=200)
+    plt.close(fig)
 
 
-        best_run = min(all_runs, key=lambda r: r["best_cost"])
-        draw_multiple_routes(points, best_run["best_route"], f"{plots_dir}/{ds_name}_all_routes.png",
-                             title=f"{ds_name} - Wszystkie trasy (baseline)")
+RENDERERS = {
+    "cost_history": plot_cost_history,
+    "routes": draw_multiple_routes,
+    "boxplot": plot_boxplot
+}
 
-def prepare_boxplot_df(output_dir):
-    all_files = glob(f"{output_dir}/*.json")
-    records = []
 
-    params = ["pop", "gen", "tour", "mut"]
+def baseline_tasks(store, datasets_files, baseline_params, plots_dir="plots"):
+    # jedno zapytanie o wszystkie przebiegi bazowe, najlepszy przebieg wybierany per dataset
+    best_runs = {}
+    for row in store.query(**baseline_filters(baseline_params)):
+        best = best_runs.get(row["dataset"])
+        if best is None or row["best_cost"] < best["best_cost"]:
+            best_runs[row["dataset"]] = row
 
-    for f in all_files:
-        runs = load_json(f)
-        if not runs:
+    tasks = []
+    histories = {}
+    for ds_file in datasets_files:
+        ds_name = dataset_name(ds_file)
+        best_run = best_runs.get(ds_name)
+        if best_run is None:
+            print(f"No baseline runs found for {ds_name}")
             continue
 
-        ds_name = os.path.basename(f).split("_")[1]  # results_<dataset>_...
-        param_values = {}
-        for param in params:
-            match = re.search(f"{param}([0-9\.]+)", f)
-            if match:
-                param_values[param] = float(match.group(1))
-            else:
-                param_values[param] = None
+        histories[ds_name] = store.history(best_run["run_id"]).tolist()
+        tasks.append(("routes", {"points": load_points(ds_file), "routes": best_run["best_route"],
+                                 "title": f"{ds_name} - Wszystkie trasy (baseline)"},
+                      f"{plots_dir}/{ds_name}_all_routes.png"))
 
-        for r in runs:
-            record = {"dataset": ds_name, "best_cost": r["best_cost"]}
-            record.update(param_values)
-            records.append(record)
+    if histories:
+        tasks.append(("cost_history", {"histories": histories}, f"{plots_dir}/all_datasets_cost_history.png"))
+    return tasks
 
-    df = pd.DataFrame(records)
-    return df
 
-def plot_boxplots(df, output_dir="plots"):
-    os.makedirs(output_dir, exist_ok=True)
+def prepare_boxplot_df(store):
+    df = store.to_dataframe()
+    df = df.rename(columns={"population_size": "pop", "generations": "gen",
+                            "tournament_size": "tour", "mutation_rate": "mut"})
+    return df[["dataset", "best_cost", "pop", "gen", "tour", "mut"]]
 
-    params = ["pop", "gen", "tour", "mut"]
-    names_title = {
-        "pop": "wielkośći populacji",
-        "gen": "generacji",
-        "tour": "rozmiaru turnieju",
-        "mut": "szansy mutacji"
-    }
 
-    names_x = {
-        "pop": "Rozmiar populacji",
-        "gen": "Ilość generacji",
-        "tour": "Rozmiar turnieju",
-        "mut": "Szansa mutacji"
-    }
-    datasets = sorted(df["dataset"].unique())
+def boxplot_tasks(df, plots_dir="plots"):
+    params = ["pop", "gen", "tour", "mut"]
 
+    tasks = []
     for param in params:
         df_param = df.copy()
         for other_param in params:
@@ -191,17 +145,74 @@ def plot_boxplots(df, output_dir="plots"):
             print(f"No data to plot for {param}. Skipping.")
             continue
 
-        plt.figure(figsize=(8,6))
-        sns.boxplot(x=param, y="best_cost", hue="dataset", data=df_param)
+        data = df_param.sort_values(["dataset", param, "best_cost"]).to_dict("list")
+        tasks.append(("boxplot", {"data": data, "param": param}, f"{plots_dir}/boxplot_{param}.png"))
+    return tasks
+
+
+def task_hash(task):
+    kind, args, _ = task
+    payload = json.dumps([PLOT_VERSION, kind, args], sort_keys=True, default=float)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def render_task(task):
+    kind, args, filename = task
+    RENDERERS[kind](filename=filename, **args)
+    return filename
+
+
+def load_manifest(plots_dir):
+    path = os.path.join(plots_dir, MANIFEST)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_manifest(plots_dir, manifest):
+    path = os.path.join(plots_dir, MANIFEST)
+    with open(path + ".tmp", "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(path + ".tmp", path)
+
+
+def render_all(tasks, plots_dir="plots", workers=None):
+    # rysowane są tylko wykresy, których dane wejściowe zmieniły się od ostatniego razu
+    os.makedirs(plots_dir, exist_ok=True)
+    manifest = load_manifest(plots_dir)
+
+    pending = []
+    for task in tasks:
+        digest = task_hash(task)
+        filename = task[2]
+        if manifest.get(filename) == digest and os.path.exists(filename):
+            continue
+        pending.append((task, digest))
+
+    if pending:
+        workers = workers or os.cpu_count()
+        if workers > 1 and len(pending) > 1:
+            with ProcessPoolExecutor(max_workers=min(workers, len(pending))) as executor:
+                list(executor.map(render_task, [task for task, _ in pending]))
+        else:
+            for task, _ in pending:
+                render_task(task)
+
+        for task, digest in pending:
+            manifest[task[2]] = digest
+        save_manifest(plots_dir, manifest)
+
+    return len(pending), len(tasks) - len(pending)
+
+
+def generate_all_baseline_plots(store, datasets_files, baseline_params, plots_dir="plots", workers=None):
+    return render_all(baseline_tasks(store, datasets_files, baseline_params, plots_dir), plots_dir, workers)
+
+
+def plot_boxplots(df, output_dir="plots", workers=None):
+    return render_all(boxplot_tasks(df, output_dir), output_dir, workers)
 
-        plt.title(f"Wpływ {names_title[param]} na długość trasy")
-        plt.xlabel(names_x[param])
-        plt.ylabel("Długość trasy")
-        plt.legend(title="Dataset")
-        plt.tight_layout()
-        plt.savefig(f"{output_dir}/boxplot_{param}.png", dpi=200)
-        plt.close()
-        print(f"Saved boxplot for {param}")
 
 if __name__ == "__main__":
     datasets_files = ["data/c101.txt", "data/r101.txt", "data/rc101.txt"]
@@ -216,9 +227,16 @@ if __name__ == "__main__":
     output_dir = "output"
     plots_dir = "plots"
 
-    generate_all_baseline_plots(output_dir, datasets_files, baseline_params, plots_dir)
+    store = ResultStore(os.path.join(output_dir, "results.db"))
+    if len(store) == 0:
+        imported = import_json_dir(output_dir, store)
+        print(f"Zaimportowano {imported} wyników z plików JSON")
+
+    # jeden przebieg po bazie, potem wszystkie wykresy w jednej puli procesów
+    tasks = baseline_tasks(store, datasets_files, baseline_params, plots_dir)
+    tasks += boxplot_tasks(prepare_boxplot_df(store), plots_dir)
+    store.close()
 
-    df = prepare_boxplot_df(output_dir)
-    plot_boxplots(df, plots_dir)
+    rendered, skipped = render_all(tasks, plots_dir)
 
-    print("Wykresy wygenerowane w katalogu 'plots'")
+    print(f"Wykresy wygenerowane w katalogu 'plots' (narysowane: {rendered}, bez zmian: {skipped})")
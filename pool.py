@@ -0,0 +1,91 @@
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+
+class JobPool:
+    # Pula procesów odporna na twardą awarię procesu roboczego (OOM, segfault, os._exit).
+    # Awaria psuje cały ProcessPoolExecutor i wszystkie zadania w locie kończą się BrokenProcessPool,
+    # więc nie wiadomo, które było winne. Pula jest wtedy odtwarzana, a zadania w locie trafiają
+    # do kwarantanny: każde w osobnym, jednoprocesowym executorze. Błędem kończy się tylko zadanie,
+    # które zepsuje swój executor w kwarantannie - pozostałe liczą się normalnie.
+    def __init__(self, fn, max_workers, max_in_flight=None):
+        self.fn = fn
+        self.max_workers = max_workers
+        self.max_in_flight = max_in_flight or 2 * max_workers
+        self.executor = None
+        # future -> (klucz zadania, argumenty, executor, czy w kwarantannie)
+        self.futures = {}
+        self.suspects = []
+        self.restarts = 0
+
+    def __len__(self):
+        return len(self.futures) + len(self.suspects)
+
+    def free(self):
+        # w trakcie kwarantanny nowe zadania czekają - podejrzane zadania dostają wszystkie procesy
+        if self.suspects or any(isolated for _, _, _, isolated in self.futures.values()):
+            return 0
+        return self.max_in_flight - len(self.futures)
+
+    def submit(self, key, *args):
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        try:
+            future = self.executor.submit(self.fn, *args)
+        except BrokenProcessPool:
+            # pula zepsuta, zanim wait() zobaczył nieudane zadania - one i tak trafią do kwarantanny
+            self._reset(self.executor)
+            self.executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            future = self.executor.submit(self.fn, *args)
+        self.futures[future] = (key, args, self.executor, False)
+
+    def wait(self, timeout=None):
+        # zwraca listę (klucz, wynik, błąd) zakończonych zadań; błąd tylko dla zadania,
+        # które zabiło proces w kwarantannie
+        isolated_count = sum(isolated for _, _, _, isolated in self.futures.values())
+        while self.suspects and isolated_count < self.max_workers:
+            key, args = self.suspects.pop(0)
+            executor = ProcessPoolExecutor(max_workers=1)
+            self.futures[executor.submit(self.fn, *args)] = (key, args, executor, True)
+            isolated_count += 1
+
+        if not self.futures:
+            return []
+
+        finished, _ = wait(self.futures, timeout=timeout, return_when=FIRST_COMPLETED)
+        outcomes = []
+        for future in finished:
+            key, args, executor, isolated = self.futures.pop(future)
+            try:
+                outcomes.append((key, future.result(), None))
+            except BrokenProcessPool as e:
+                if isolated:
+                    outcomes.append((key, None, f"{type(e).__name__}: {e}"))
+                else:
+                    self.suspects.append((key, args))
+                    self._reset(executor)
+            finally:
+                if isolated:
+                    executor.shutdown(wait=False)
+        return outcomes
+
+    def _reset(self, executor):
+        # tylko bieżąca pula - zadania starej, już wymienionej puli nie psują nowej
+        executor.shutdown(wait=False)
+        if executor is self.executor:
+            self.executor = None
+            self.restarts += 1
+
+    def close(self):
+        for _, _, executor, isolated in self.futures.values():
+            if isolated:
+                executor.shutdown(wait=False)
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,60 @@
+import numpy as np
+
+# Populacja jako tablica (rozmiar populacji x liczba klientów); operatory działają na
+# całej partii potomków naraz, bez pętli po genomach w Pythonie.
+
+
+def genome_dtype(num_customers):
+    return np.int16 if num_customers < np.iinfo(np.int16).max else np.int32
+
+
+def init_population(rng, population_size, num_customers):
+    base = np.arange(1, num_customers + 1, dtype=genome_dtype(num_customers))
+    return rng.permuted(np.tile(base, (population_size, 1)), axis=1)
+
+
+def tournament_select(rng, fitness, tournament_size, count):
+    # turniej bez powtórzeń w obrębie turnieju, jak sample() w wersji listowej
+    keys = rng.random((count, len(fitness)))
+    candidates = np.argpartition(keys, tournament_size - 1, axis=1)[:, :tournament_size]
+    winners = np.argmin(fitness[candidates], axis=1)
+    return candidates[np.arange(count), winners]
+
+
+def ox_crossover(rng, parents1, parents2):
+    # OX: segment [start, end) z parents1, reszta genów w kolejności z parents2,
+    # wpisywana od pozycji end z zawinięciem - tak jak crossover() w solver.py
+    count, size = parents1.shape
+    rows = np.arange(count)[:, None]
+
+    cuts = np.sort(np.argsort(rng.random((count, size)), axis=1)[:, :2], axis=1)
+    start = cuts[:, :1]
+    end = cuts[:, 1:]
+    positions = np.arange(size)[None, :]
+    in_segment = (positions >= start) & (positions < end)
+
+    # maska przynależności genu do segmentu, indeksowana numerem klienta
+    member = np.zeros((count, size + 1), dtype=bool)
+    member[rows, parents1] = in_segment
+
+    keep = ~member[rows, parents2]
+    order = np.argsort(~keep, axis=1, kind="stable")
+    genes = np.take_along_axis(parents2, order, axis=1)
+    targets = (end + positions) % size
+    fill = positions < (size - (end - start))
+
+    children = np.where(in_segment, parents1, 0).astype(parents1.dtype)
+    children[np.broadcast_to(rows, fill.shape)[fill], targets[fill]] = genes[fill]
+    return children
+
+
+def mutate_batch(rng, children, mutation_rate):
+    # zamiana dwóch różnych pozycji w losowo wybranych potomkach; zwraca liczbę mutacji
+    count, size = children.shape
+    mutated = np.flatnonzero(rng.random(count) < mutation_rate)
+    idx1 = rng.integers(0, size, len(mutated))
+    idx2 = (idx1 + rng.integers(1, size, len(mutated))) % size
+    first = children[mutated, idx1]
+    children[mutated, idx1] = children[mutated, idx2]
+    children[mutated, idx2] = first
+    return len(mutated)
@@ -0,0 +1,91 @@
+import time
+from collections import defaultdict
+
+
+class Profiler:
+    def __init__(self, progress_every=0, caches=None):
+        self.progress_every = progress_every
+        self.caches = caches or {}
+        self.counters = defaultdict(int)
+        self.timers = defaultdict(float)
+        # kolumny: nazwa -> lista wartości dla kolejnych pokoleń
+        self.per_generation = defaultdict(list)
+        self.generation = 0
+
+        self._last_counters = {}
+        self._last_timers = {}
+        self._last_cache = {name: (0, 0) for name in self.caches}
+        self._last_time = time.perf_counter()
+
+    def add_cache(self, name, cache):
+        # cache utworzony po starcie profilera - liczniki od bieżącego stanu
+        self.caches[name] = cache
+        self._last_cache[name] = (cache.hits, cache.misses)
+
+    def count(self, name, value=1):
+        self.counters[name] += value
+
+    def add_time(self, name, elapsed):
+        self.timers[name] += elapsed
+
+    def _cache_deltas(self):
+        deltas = {}
+        for name, cache in self.caches.items():
+            hits, misses = self._last_cache[name]
+            deltas[f"{name}_cache_hits"] = cache.hits - hits
+            deltas[f"{name}_cache_misses"] = cache.misses - misses
+            self._last_cache[name] = (cache.hits, cache.misses)
+        return deltas
+
+    def end_generation(self, best_fitness=None):
+        now = time.perf_counter()
+        row = {"wall_time": now - self._last_time}
+        self._last_time = now
+
+        for name, value in self.counters.items():
+            row[name] = value - self._last_counters.get(name, 0)
+        for name, value in self.timers.items():
+            row[f"{name}_time"] = value - self._last_timers.get(name, 0.0)
+        row.update(self._cache_deltas())
+
+        self._last_counters = dict(self.counters)
+        self._last_timers = dict(self.timers)
+
+        # kolumna, która pojawiła się później, jest dopełniana zerami od początku
+        for name, value in row.items():
+            column = self.per_generation[name]
+            if len(column) < self.generation:
+                column.extend([0] * (self.generation - len(column)))
+            column.append(value)
+
+        self.generation += 1
+
+        if self.progress_every and self.generation % self.progress_every == 0:
+            self.print_progress(best_fitness)
+
+    def print_progress(self, best_fitness=None):
+        n = min(self.progress_every, self.generation)
+        window = {name: sum(values[-n:]) for name, values in self.per_generation.items()}
+
+        parts = []
+        if best_fitness is not None:
+            parts.append(f"best {best_fitness:.2f}")
+        parts.append(f"{n / window['wall_time']:.1f} pok/s" if window["wall_time"] > 0 else "- pok/s")
+        for name in ("evaluate", "decode", "two_opt", "local_search", "selection", "crossover", "mutation"):
+            if f"{name}_time" in window:
+                parts.append(f"{name} {window[f'{name}_time']:.3f}s")
+        if "two_opt_calls" in window:
+            parts.append(f"2-opt {window['two_opt_calls']} wyw./{window.get('two_opt_moves', 0)} ruchów")
+        for name in self.caches:
+            hits = window.get(f"{name}_cache_hits", 0)
+            total = hits + window.get(f"{name}_cache_misses", 0)
+            if total:
+                parts.append(f"cache {name} {hits / total:.0%}")
+        print(f"[pokolenie {self.generation}] " + " | ".join(parts))
+
+    def to_dict(self):
+        return {
+            "counters": dict(self.counters),
+            "timers": dict(self.timers),
+            "per_generation": dict(self.per_generation)
+        }
@@ -0,0 +1,166 @@
+import json
+import os
+import re
+import sqlite3
+from glob import glob
+
+import numpy as np
+
+# kolumny typowane - wszystko inne z rekordu trafia do "extra" jako JSON
+COLUMNS = [
+    ("dataset", "TEXT"),
+    ("dataset_path", "TEXT"),
+    ("population_size", "INTEGER"),
+    ("generations", "INTEGER"),
+    ("tournament_size", "INTEGER"),
+    ("mutation_rate", "REAL"),
+    ("decoder", "TEXT"),
+    ("seed", "INTEGER"),
+    ("repeat", "INTEGER"),
+    ("best_cost", "REAL"),
+    ("worst_cost", "REAL"),
+    ("mean_cost", "REAL"),
+    ("std_cost", "REAL"),
+    ("num_vehicles", "INTEGER"),
+    ("time", "REAL"),
+]
+PARAM_COLUMNS = ("dataset", "population_size", "generations", "tournament_size", "mutation_rate", "decoder")
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    {", ".join(f"{name} {kind}" for name, kind in COLUMNS)},
+    best_route TEXT,
+    extra TEXT
+);
+CREATE INDEX IF NOT EXISTS runs_params ON runs ({", ".join(PARAM_COLUMNS)});
+CREATE TABLE IF NOT EXISTS histories (
+    run_id INTEGER PRIMARY KEY REFERENCES runs(run_id),
+    length INTEGER,
+    data BLOB
+);
+"""
+
+
+def dataset_name(path):
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+class ResultStore:
+    def __init__(self, path="output/results.db"):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # WAL + timeout pozwala dopisywać z wielu procesów jednocześnie
+        self.conn = sqlite3.connect(path, timeout=60)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+
+    def append(self, record):
+        record = dict(record)
+        history = np.asarray(record.pop("history", []), dtype=np.float64)
+        best_route = record.pop("best_route", [])
+
+        path = record.pop("dataset")
+        row = {
+            "dataset": dataset_name(path),
+            "dataset_path": path,
+            "repeat": record.pop("id", None),
+            "num_vehicles": len(best_route)
+        }
+        for name, _ in COLUMNS:
+            if name not in row:
+                row[name] = record.pop(name, None)
+
+        names = list(row)
+        with self.conn:
+            cursor = self.conn.execute(
+                f"INSERT INTO runs ({', '.join(names)}, best_route, extra) "
+                f"VALUES ({', '.join('?' * (len(names) + 2))})",
+                [row[name] for name in names] + [json.dumps(best_route), json.dumps(record)])
+            run_id = cursor.lastrowid
+            self.conn.execute("INSERT INTO histories (run_id, length, data) VALUES (?, ?, ?)",
+                              (run_id, len(history), history.tobytes()))
+        return run_id
+
+    def query(self, **filters):
+        where = []
+        values = []
+        for name, value in filters.items():
+            if name not in PARAM_COLUMNS and name not in dict(COLUMNS):
+                raise ValueError(f"Nieznana kolumna: {name}")
+            where.append(f"{name} = ?")
+            values.append(value)
+
+        sql = "SELECT * FROM runs"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY run_id"
+
+        cursor = self.conn.execute(sql, values)
+        names = [d[0] for d in cursor.description]
+        rows = []
+        for values in cursor.fetchall():
+            row = dict(zip(names, values))
+            row["best_route"] = json.loads(row["best_route"])
+            row["extra"] = json.loads(row["extra"])
+            rows.append(row)
+        return rows
+
+    def best(self, **filters):
+        rows = self.query(**filters)
+        return min(rows, key=lambda r: r["best_cost"]) if rows else None
+
+    def history(self, run_id):
+        row = self.conn.execute("SELECT data FROM histories WHERE run_id = ?", (run_id,)).fetchone()
+        if row is None:
+            raise KeyError(run_id)
+        return np.frombuffer(row[0], dtype=np.float64)
+
+    def to_dataframe(self, **filters):
+        import pandas as pd
+
+        rows = self.query(**filters)
+        for row in rows:
+            del row["best_route"]
+            del row["extra"]
+        return pd.DataFrame(rows, columns=["run_id"] + [name for name, _ in COLUMNS])
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM runs").fetchone()[0]
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def import_json_dir(output_dir, store):
+    # migracja starych plików results_<dataset>_pop.._gen.._tour.._mut.._id...json
+    count = 0
+    for f in sorted(glob(os.path.join(output_dir, "*.json"))):
+        match = re.search(r"results_(.+)_pop(\d+)_gen(\d+)_tour(\d+)_mut([0-9.]+)_id(\d+)\.json$", f)
+        with open(f) as fh:
+            for line in fh:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if match:
+                    record.setdefault("population_size", int(match.group(2)))
+                    record.setdefault("generations", int(match.group(3)))
+                    record.setdefault("tournament_size", int(match.group(4)))
+                    record.setdefault("mutation_rate", float(match.group(5)))
+                    record.setdefault("id", int(match.group(6)))
+                for name in ("population_size", "generations", "tournament_size"):
+                    record[name] = int(record[name])
+                record["mutation_rate"] = float(record["mutation_rate"])
+                store.append(record)
+                count += 1
+    return count
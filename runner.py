@@ -1,57 +1,243 @@
-import subprocess
+import argparse
+import math
 import os
-from concurrent.futures import ProcessPoolExecutor
+import time
+import traceback
+from multiprocessing import Manager
+from queue import Empty
 
+from loader import load_instance
+from pool import JobPool
+from results import ResultStore, dataset_name
+from solver import Params, solve
+from telemetry import LiveSummary, QueueSink
 from test_kits import *
 
-def launch(params):
-    ds_name = os.path.splitext(os.path.basename(params['file']))[0]
-    output_file = f"output/results_{ds_name}_pop{params['population_size']}_gen{params['generations']}_tour{params['tournament_size']}_mut{params['mutation_rate']}_id{params['id']}.json"
+# instancje wczytane w danym procesie roboczym - każdy plik parsowany jest raz na proces
+_instances = {}
 
-    cmd = [
-        'python', 'main.py',
-        str(params['file']),
-        output_file,
-        str(params['population_size']),
-        str(params['generations']),
-        str(params['tournament_size']),
-        str(params['mutation_rate'])
-    ]
+# kwantyle t-Studenta dla dwustronnego przedziału 95%, df = 1..30; dalej 1.96
+T_QUANTILES_95 = [12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+                  2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+                  2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042]
 
+
+def get_instance(filename):
+    instance = _instances.get(filename)
+    if instance is None:
+        instance = load_instance(filename, verbose=False)
+        _instances[filename] = instance
+    return instance
+
+
+def job_cost(params):
+    return params['generations'] * params['population_size']
+
+
+def job_label(params):
+    return (f"{os.path.basename(params['file'])} pop={params['population_size']} gen={params['generations']} "
+            f"tour={params['tournament_size']} mut={params['mutation_rate']} seed={params.get('seed')}/{params.get('id')}")
+
+
+def run_job(params, events=None):
     try:
-        subprocess.run(cmd, check=True)
-    except subprocess.CalledProcessError as e:
-        print(f"Crash with parameters: {params}")
-        print(f"Error: {e}")
+        instance = get_instance(params['file'])
+        result = solve(instance, Params(params['population_size'], params['generations'],
+                                        params['tournament_size'], params['mutation_rate'], verbose=False,
+                                        seed=params.get('seed'), spawn_key=params.get('spawn_key', ()),
+                                        decoder=params.get('decoder', "greedy"),
+                                        time_limit=params.get('time_limit'),
+                                        stall_generations=params.get('stall_generations', 0),
+                                        telemetry=QueueSink(events) if events is not None else None,
+                                        telemetry_job=job_label(params)))
+        record = result.to_dict()
+        record['id'] = params['id']
+        return record, None
+    except Exception:
+        return None, traceback.format_exc()
+
+
+def config_key(config):
+    return (config['file'], int(config['population_size']), int(config['generations']),
+            int(config['tournament_size']), float(config['mutation_rate']), config.get('decoder', "greedy"))
+
+
+def dedup_configs(configs):
+    # ta sama konfiguracja wpisana w kilku grupach eksperymentów liczona jest raz
+    unique = {}
+    for config in configs:
+        unique.setdefault(config_key(config), dict(config, decoder=config.get('decoder', "greedy")))
+    return list(unique.values())
+
+
+def ci_half_width(values):
+    # połowa szerokości 95% przedziału ufności średniej
+    n = len(values)
+    if n < 2:
+        return float('inf')
+    mean = sum(values) / n
+    std = math.sqrt(sum((v - mean) ** 2 for v in values) / (n - 1))
+    t = T_QUANTILES_95[n - 2] if n - 1 <= len(T_QUANTILES_95) else 1.96
+    return t * std / math.sqrt(n)
+
+
+def ci_narrow(values, ci_target):
+    if len(values) < 2:
+        return False
+    mean = sum(values) / len(values)
+    return ci_half_width(values) <= ci_target * abs(mean)
+
+
+class ConfigState:
+    def __init__(self, config, base_seed, used_repeats, costs):
+        self.config = config
+        self.base_seed = base_seed
+        self.used_repeats = used_repeats
+        self.costs = costs
+        self.in_flight = 0
+
+    def next_job(self):
+        # powtórzenie r ma strumień SeedSequence(base_seed, spawn_key=(r,)) - ten sam r daje
+        # te same liczby losowe w każdej konfiguracji
+        repeat = 0
+        while repeat in self.used_repeats:
+            repeat += 1
+        self.used_repeats.add(repeat)
+        self.in_flight += 1
+        return dict(self.config, id=repeat, seed=self.base_seed, spawn_key=(repeat,))
+
+
+def completed_runs(store, config, base_seed):
+    # pary (konfiguracja, ziarno/powtórzenie) już w bazie; stare rekordy bez ziarna liczą się po numerze powtórzenia
+    rows = store.query(dataset=dataset_name(config['file']), population_size=config['population_size'],
+                       generations=config['generations'], tournament_size=config['tournament_size'],
+                       mutation_rate=config['mutation_rate'], decoder=config['decoder'])
+    repeats = set()
+    costs = []
+    for row in rows:
+        if row['seed'] is not None and row['seed'] != base_seed:
+            continue
+        if row['repeat'] in repeats:
+            continue
+        repeats.add(row['repeat'])
+        costs.append(row['best_cost'])
+    return repeats, costs
+
+
+def plan_jobs(state, min_repeats, max_repeats, ci_target):
+    # najpierw minimum powtórzeń, potem po jednym, dopóki przedział ufności jest za szeroki
+    total = len(state.costs) + state.in_flight
+    if total < min_repeats:
+        return [state.next_job() for _ in range(min_repeats - total)]
+    if state.in_flight == 0 and total < max_repeats and not ci_narrow(state.costs, ci_target):
+        return [state.next_job()]
+    return []
+
+
+def drain_events(events, summary):
+    while True:
+        try:
+            summary.update(events.get_nowait())
+        except Empty:
+            return
+
+
+def run_sweep(configs, store, min_repeats=3, max_repeats=10, ci_target=0.01, max_workers=None,
+              summary_every=30.0, base_seed=0):
+    max_workers = max_workers or os.cpu_count()
+    configs = dedup_configs(configs)
+
+    queue = []
+    skipped = 0
+    for config in configs:
+        repeats, costs = completed_runs(store, config, base_seed)
+        skipped += len(costs)
+        state = ConfigState(config, base_seed, repeats, costs)
+        queue.extend((state, job) for job in plan_jobs(state, min_repeats, max_repeats, ci_target))
+
+    print(f"Konfiguracje: {len(configs)} | ukończone przebiegi w bazie: {skipped} | w kolejce: {len(queue)}")
+
+    failed = []
+    done = 0
+    start = time.perf_counter()
+    last_summary = start
+    # zdarzenia z pokoleń zadań w toku, zbierane w procesie głównym
+    summary = LiveSummary()
+    with Manager() as manager, JobPool(run_job, max_workers) as pool:
+        events = manager.Queue()
+        while queue or len(pool):
+            # najdłuższe zadania najpierw; w locie co najwyżej 2 zadania na proces
+            queue.sort(key=lambda item: job_cost(item[1]), reverse=True)
+            while queue and pool.free() > 0:
+                state, job = queue.pop(0)
+                pool.submit((state, job), job, events)
+
+            finished = pool.wait(timeout=1.0)
+            drain_events(events, summary)
+            now = time.perf_counter()
+            if summary_every and now - last_summary >= summary_every and summary.jobs:
+                print(f"--- {len(summary.jobs)} zadań w toku ({now - start:.0f}s) ---")
+                for line in summary.lines():
+                    print(line)
+                last_summary = now
+
+            for (state, job), outcome, crash in finished:
+                state.in_flight -= 1
+                done += 1
+                record, error = outcome if crash is None else (None, crash)
+
+                if error is not None:
+                    summary.drop(job_label(job))
+                    print(f"[{done}] Crash with parameters: {job}")
+                    print(f"Error: {error}")
+                    failed.append((job, error))
+                    continue
+
+                # zapis wyłącznie w procesie głównym - workery tylko liczą
+                store.append(record)
+                state.costs.append(record['best_cost'])
+                queue.extend((state, new_job) for new_job in plan_jobs(state, min_repeats, max_repeats, ci_target))
+
+                print(f"[{done} gotowe | {len(pool)} w toku | {len(queue)} w kolejce | "
+                      f"{time.perf_counter() - start:.0f}s] {job_label(job)} -> {record['best_cost']:.2f} "
+                      f"(n={len(state.costs)}, CI ±{ci_half_width(state.costs):.2f})")
+
+    return failed
 
 
 def main():
-    jobs = []
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument("--db", default="output/results.db")
+    parser.add_argument("--min-repeats", type=int, default=3)
+    parser.add_argument("--max-repeats", type=int, default=10)
+    parser.add_argument("--ci", type=float, default=0.01,
+                        help="docelowa względna połowa szerokości 95%% CI dla best_cost (0.01 = 1%%)")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0, help="ziarno bazowe sweepa; powtórzenia dostają spawn_key")
+    parser.add_argument("--summary-every", type=float, default=30.0, help="podsumowanie zadań w toku co N sekund")
+
+    args = parser.parse_args()
 
     datasets = ["data/c101.txt", "data/r101.txt", "data/rc101.txt"]
 
+    configs = []
     for exp in EXPERIMENTS_GA:
         for ds in datasets:
-            job = {
+            configs.append({
                 "file": ds,
                 "population_size": exp["population_size"],
                 "generations": exp["generations"],
                 "tournament_size": exp["tournament_size"],
                 "mutation_rate": exp["mutation_rate"]
-            }
-            jobs.append(job)
-
-    all_jobs = []
-    for job in jobs:
-        for r in range(5):
-            new_job = job.copy()
-            new_job['id'] = r
-            all_jobs.append(new_job)
+            })
 
-    print(f"Total jobs to run: {len(all_jobs)}")
+    with ResultStore(args.db) as store:
+        failed = run_sweep(configs, store, args.min_repeats, args.max_repeats, args.ci, args.workers,
+                           args.summary_every, args.seed)
 
-    with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
-        executor.map(launch, all_jobs)
+    if failed:
+        print(f"Failed jobs: {len(failed)}")
 
 
 if __name__ == '__main__':
@@ -0,0 +1,23 @@
+import secrets
+from random import Random
+
+import numpy as np
+
+# Wszystkie losowania idą przez jawne generatory wyprowadzone z jednego SeedSequence:
+# (ziarno, spawn_key) jednoznacznie odtwarza przebieg. Zadanie/powtórzenie dostaje własny
+# spawn_key od runnera, wyspy dostają potomne sekwencje przez spawn().
+
+
+def seed_sequence(seed=None, spawn_key=()):
+    # seed=None - świeże losowe ziarno; seq.entropy trafia do wyniku, więc przebieg da się powtórzyć
+    # (63 bity, żeby zmieściło się w kolumnie INTEGER bazy wyników)
+    if seed is None:
+        seed = secrets.randbits(63)
+    return np.random.SeedSequence(seed, spawn_key=tuple(spawn_key))
+
+
+def make_rngs(seq):
+    # para niezależnych strumieni: random.Random dla operatorów listowych, Generator dla NumPy
+    py_seq, np_seq = seq.spawn(2)
+    py_seed = int.from_bytes(py_seq.generate_state(4).tobytes(), "little")
+    return Random(py_seed), np.random.default_rng(np_seq)
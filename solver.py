@@ -0,0 +1,526 @@
+import time
+import numpy as np
+from random import Random
+
+from cache import GENOME_CACHE_GENERATIONS, ROUTE_CACHE_SIZE, LRUCache
+from checkpoint import Checkpoint, check_compatible
+from diversity import DiversityControl
+from evaluation import DECODERS, calculate_fitness, evaluate_genome, optimize_route_cached, worth_reference
+from islands import run_islands
+from local_search import improve_solution
+from parallel import ParallelEvaluator
+from population import genome_dtype, init_population, mutate_batch, ox_crossover, tournament_select
+from profiler import Profiler
+from seeding import make_rngs, seed_sequence
+from stopping import StoppingCriteria
+from telemetry import Telemetry, make_sink
+
+
+class Params:
+    def __init__(self, population_size, generations, tournament_size, mutation_rate,
+                 cache_size=None, workers=1, seed=None, verbose=True, decoder="greedy",
+                 profile=False, progress_every=0, islands=1, migration_interval=50, migrants=2, topology="ring",
+                 incremental=False, local_search="none", time_limit=None, stall_generations=0, target_fitness=None,
+                 bks=None, target_gap=0.0, checkpoint=None, checkpoint_every=100, resume=False, engine="list",
+                 telemetry=None, telemetry_interval=1.0, telemetry_job=None, spawn_key=(), diversity="none",
+                 restart_threshold=0.0, restart_fraction=0.5, restart_cooldown=50, route_cache_size=ROUTE_CACHE_SIZE):
+        self.population_size = int(population_size)
+        self.generations = int(generations)
+        self.tournament_size = int(tournament_size)
+        self.mutation_rate = float(mutation_rate)
+        # cache_size - pojemność cache genomów, domyślnie GENOME_CACHE_GENERATIONS pokoleń populacji
+        self.cache_size = cache_size if cache_size is not None else GENOME_CACHE_GENERATIONS * self.population_size
+        self.route_cache_size = route_cache_size
+        self.workers = workers
+        self.seed = seed
+        # strumień losowy przebiegu: SeedSequence(seed, spawn_key), np. spawn_key=(powtórzenie,) z runnera
+        self.spawn_key = tuple(spawn_key)
+        self.verbose = verbose
+        self.decoder = decoder
+        self.profile = profile
+        self.progress_every = progress_every
+        self.islands = islands
+        self.migration_interval = migration_interval
+        self.migrants = migrants
+        self.topology = topology
+        self.incremental = incremental
+        self.local_search = local_search
+        self.time_limit = time_limit
+        self.stall_generations = stall_generations
+        self.target_fitness = target_fitness
+        self.bks = bks
+        self.target_gap = target_gap
+        self.checkpoint = checkpoint
+        self.checkpoint_every = checkpoint_every
+        self.resume = resume
+        self.engine = engine
+        # telemetry - specyfikacja ujścia ("jsonl:plik", "unix:gniazdo", "http:port") albo obiekt z emit()
+        self.telemetry = telemetry
+        self.telemetry_interval = telemetry_interval
+        self.telemetry_job = telemetry_job
+        # diversity: "none", "remutate" albo "reject" - co zrobić z potomkiem identycznym z innym genomem pokolenia
+        self.diversity = diversity
+        self.restart_threshold = restart_threshold
+        self.restart_fraction = restart_fraction
+        self.restart_cooldown = restart_cooldown
+
+    def __repr__(self):
+        return (f"Pop: {self.population_size} | Gen: {self.generations} | "
+                f"Tour: {self.tournament_size} | Mut: {self.mutation_rate}")
+
+
+class Result:
+    def __init__(self, instance, params, routes, distance, cost_history, elapsed, cache_stats, profile=None,
+                 stop_reason="generations", seed=None, spawn_key=(), diversity=None):
+        self.instance = instance
+        self.params = params
+        self.routes = routes
+        self.distance = distance
+        self.cost_history = cost_history
+        self.elapsed = elapsed
+        self.cache_stats = cache_stats
+        self.profile = profile
+        self.stop_reason = stop_reason
+        # faktycznie użyte ziarno (entropia SeedSequence) - także gdy params.seed było None
+        self.seed = seed
+        self.spawn_key = spawn_key
+        self.diversity = diversity
+
+    @property
+    def num_vehicles(self):
+        return len(self.routes)
+
+    def to_dict(self):
+        record = {
+            "dataset": self.instance.name,
+            "population_size": self.params.population_size,
+            "generations": self.params.generations,
+            "tournament_size": self.params.tournament_size,
+            "mutation_rate": self.params.mutation_rate,
+            "best_cost": self.distance,
+            "worst_cost": max(self.cost_history),
+            "mean_cost": sum(self.cost_history)/len(self.cost_history),
+            "std_cost": float(np.std(self.cost_history)),
+            "history": self.cost_history,
+            "best_route": self.routes,
+            "time": self.elapsed,
+            "seed": self.seed,
+            "spawn_key": list(self.spawn_key),
+            "decoder": self.params.decoder,
+            "local_search": self.params.local_search,
+            "stop_reason": self.stop_reason,
+            "generations_run": len(self.cost_history),
+            "cache": self.cache_stats
+        }
+        if self.params.islands > 1:
+            record["islands"] = self.params.islands
+            record["migration_interval"] = self.params.migration_interval
+            record["migrants"] = self.params.migrants
+            record["topology"] = self.params.topology
+        if self.diversity is not None:
+            record["diversity"] = self.diversity
+        if self.profile is not None:
+            record["profile"] = self.profile
+        return record
+
+    def __repr__(self):
+        return f"Result: {self.instance.name} | Pojazdy: {self.num_vehicles} | Dystans: {self.distance:.2f}"
+
+
+def crossover(parent1, parent2, rng):
+    # zwraca potomka i długość segmentu, który zachował pozycje z parent1
+    size = len(parent1)
+    start, end = sorted(rng.sample(range(size), 2))
+    child = [-1] * size
+    child[start:end] = parent1[start:end]
+
+    current_pos = end
+    for gene in parent2:
+        if gene not in child:
+            if current_pos >= size:
+                current_pos = 0
+            child[current_pos] = gene
+            current_pos += 1
+
+    return child, end - start
+
+
+def mutate(genome, rng):
+    idx1, idx2 = rng.sample(range(len(genome)), 2)
+    genome[idx1], genome[idx2] = genome[idx2], genome[idx1]
+    return genome
+
+
+def evaluate_population(population, instance, genome_cache, route_cache, evaluator=None, decoder="greedy",
+                        profiler=None, decode_cache=None, references=None, local_search=False):
+    if evaluator is None:
+        if references is None:
+            references = [None] * len(population)
+        return [evaluate_genome(genome, instance, genome_cache, route_cache, decoder, profiler, decode_cache, reference,
+                                local_search)
+                for genome, reference in zip(population, references)]
+
+    # do procesów trafiają tylko unikalne genomy, których nie ma w cache
+    results = [genome_cache.get(tuple(genome)) for genome in population]
+    pending = {}
+    for i, result in enumerate(results):
+        if result is None:
+            pending.setdefault(tuple(population[i]), []).append(i)
+
+    if pending:
+        keys = list(pending)
+        for key, result in zip(keys, evaluator.evaluate([list(key) for key in keys])):
+            genome_cache.put(key, result)
+            for i in pending[key]:
+                results[i] = result
+
+    return results
+
+
+def run_genetic_algorithm(instance, population_size, generations, tournament_size, mutation_rate,
+                          genome_cache=None, route_cache=None, workers=1, verbose=True, decoder="greedy",
+                          profiler=None, migrate=None, incremental=False, local_search=False, stopping=None,
+                          checkpoint=None, resume_state=None, engine="list", rng=None, np_rng=None,
+                          telemetry=None, diversity=None):
+    customer_ids = list(range(1, len(instance)))
+    cost_history = []
+
+    # rozmiar 0 wyłącza cache - każde zapytanie to miss
+    if genome_cache is None:
+        genome_cache = LRUCache(0)
+    if route_cache is None:
+        route_cache = LRUCache(0)
+
+    # rng - random.Random dla operatorów listowych, np_rng - Generator dla silnika "numpy"
+    if rng is None:
+        rng = Random()
+    if np_rng is None:
+        np_rng = np.random.default_rng()
+
+    # engine "numpy": populacja jako tablica, operatory wektorowe
+    vectorized = engine == "numpy"
+    if vectorized:
+        dtype = genome_dtype(len(customer_ids))
+        population = init_population(np_rng, population_size, len(customer_ids))
+    else:
+        population = []
+        for _ in range(population_size):
+            shuffled = customer_ids[:]
+            rng.shuffle(shuffled)
+            population.append(shuffled)
+
+    # dekodowanie przyrostowe (greedy): potomek jest dekodowany względem rodzica, z którego
+    # krzyżowanie OX zachowało segment na tych samych pozycjach
+    decode_cache = None
+    references = None
+    if incremental and workers <= 1:
+        decode_cache = LRUCache(4 * population_size)
+        if profiler is not None:
+            profiler.add_cache("decode", decode_cache)
+
+    best_overall_genome = None
+    best_overall_fitness = float('inf')
+    best_vehicles_count = float('inf')
+    best_distance_val = float('inf')
+
+    if verbose:
+        print(f"\nSTART HYBRYDOWEGO GENETYKA (Max pokoleń: {generations})")
+        print("To może chwilę potrwać, bo 2-opt intensywnie liczy...")
+
+    evaluator = None
+
+    if stopping is not None:
+        stopping.start()
+
+    first_gen = 0
+    if resume_state is not None:
+        # wznowienie: populacja i stan RNG z końca zapisanego pokolenia
+        population = resume_state["population"]
+        cost_history = resume_state["cost_history"]
+        best_overall_genome = resume_state["best_genome"]
+        best_overall_fitness = resume_state["best_fitness"]
+        best_vehicles_count = resume_state["best_vehicles"]
+        best_distance_val = resume_state["best_distance"]
+        rng.setstate(resume_state["random_state"])
+        np_rng.bit_generator.state = resume_state["numpy_state"]
+        if vectorized:
+            population = np.asarray(population, dtype=dtype)
+        if stopping is not None:
+            stopping.restore(resume_state["stopping"])
+        if diversity is not None and resume_state.get("diversity") is not None:
+            diversity.restore(resume_state["diversity"])
+        # zakończony przebieg wznawiany jest tylko po zwiększeniu liczby pokoleń (przedłużenie)
+        first_gen = resume_state["generation"]
+        if resume_state["finished"] and generations <= resume_state.get("generations", first_gen):
+            first_gen = generations
+        if verbose:
+            print(f"Wznowienie od pokolenia {resume_state['generation']}")
+
+    def save_checkpoint(generation, finished):
+        checkpoint.save({
+            "dataset": instance.name,
+            "generation": generation,
+            "generations": generations,
+            "engine": engine,
+            "decoder": decoder,
+            "finished": finished,
+            "population": population,
+            "cost_history": cost_history,
+            "best_genome": best_overall_genome,
+            "best_fitness": best_overall_fitness,
+            "best_vehicles": best_vehicles_count,
+            "best_distance": best_distance_val,
+            "random_state": rng.getstate(),
+            "numpy_state": np_rng.bit_generator.state,
+            "stopping": stopping.state() if stopping is not None else None,
+            "diversity": diversity.state() if diversity is not None else None
+        })
+
+    try:
+        # pula i pamięć współdzielona powstają w bloku try - finally zwolni je także po błędzie
+        if workers > 1:
+            evaluator = ParallelEvaluator(instance, workers, route_cache.maxsize, decoder, local_search)
+            if verbose:
+                print(f"Ocena populacji równolegle w {workers} procesach")
+
+        for gen in range(first_gen, generations):
+            scored_population = []
+            genomes = population.tolist() if vectorized else population
+            if profiler is not None:
+                start = time.perf_counter()
+            scores = evaluate_population(genomes, instance, genome_cache, route_cache, evaluator, decoder,
+                                         profiler, decode_cache, references, local_search)
+            if profiler is not None:
+                profiler.add_time("evaluate", time.perf_counter() - start)
+
+            for genome, (fitness, num_vehicles, total_optimized_dist) in zip(genomes, scores):
+                scored_population.append((fitness, genome, num_vehicles, total_optimized_dist))
+
+                if fitness < best_overall_fitness:
+                    best_overall_fitness = fitness
+                    best_overall_genome = genome[:]
+                    best_vehicles_count = num_vehicles
+                    best_distance_val = total_optimized_dist
+
+            best_gen_cost = min(x[3] for x in scored_population)
+            cost_history.append(best_gen_cost)
+            if diversity is not None:
+                diversity.measure(genomes, scores)
+
+            new_population = []
+            new_references = []
+
+            scored_population.sort(key=lambda x: x[0])  
+            new_population.append(scored_population[0][1])
+            new_population.append(scored_population[1][1])
+
+            # model wysp: imigranci zastępują część potomstwa tego pokolenia
+            if migrate is not None:
+                new_population.extend(migrate(gen, scored_population)[:population_size - len(new_population)])
+            new_references.extend([None] * len(new_population))
+            protected = len(new_population)
+            if diversity is not None and not vectorized:
+                diversity.start_generation(new_population, population_size)
+
+            if vectorized:
+                num_children = population_size - len(new_population)
+                fitness = np.array([score[0] for score in scores])
+                if profiler is not None:
+                    t0 = time.perf_counter()
+
+                parents1 = tournament_select(np_rng, fitness, tournament_size, num_children)
+                parents2 = tournament_select(np_rng, fitness, tournament_size, num_children)
+
+                if profiler is not None:
+                    t1 = time.perf_counter()
+
+                children = ox_crossover(np_rng, population[parents1], population[parents2])
+
+                if profiler is not None:
+                    t2 = time.perf_counter()
+
+                mutations = mutate_batch(np_rng, children, mutation_rate)
+
+                if profiler is not None:
+                    profiler.add_time("selection", t1 - t0)
+                    profiler.add_time("crossover", t2 - t1)
+                    profiler.add_time("mutation", time.perf_counter() - t2)
+                    profiler.count("mutations", mutations)
+
+                new_population = np.concatenate([np.array(new_population, dtype=dtype).reshape(-1, children.shape[1]),
+                                                 children])
+                if diversity is not None:
+                    diversity.dedup_rows(new_population, protected, np_rng)
+                kept = (new_population[protected:] == population[parents1]).sum(axis=1)
+                new_references.extend(genomes[i] if worth_reference(k, len(customer_ids)) else None
+                                      for i, k in zip(parents1, kept.tolist()))
+
+            while len(new_population) < population_size:
+                if profiler is not None:
+                    t0 = time.perf_counter()
+
+                tournament = rng.sample(scored_population, tournament_size)
+                parent1 = min(tournament, key=lambda x: x[0])[1]
+
+                tournament = rng.sample(scored_population, tournament_size)
+                parent2 = min(tournament, key=lambda x: x[0])[1]
+
+                if profiler is not None:
+                    t1 = time.perf_counter()
+
+                child, kept = crossover(parent1, parent2, rng)
+
+                if profiler is not None:
+                    t2 = time.perf_counter()
+                    profiler.add_time("selection", t1 - t0)
+                    profiler.add_time("crossover", t2 - t1)
+
+                if rng.random() < mutation_rate:
+                    child = mutate(child, rng)
+                    if profiler is not None:
+                        profiler.add_time("mutation", time.perf_counter() - t2)
+                        profiler.count("mutations")
+
+                if diversity is not None:
+                    child = diversity.admit(child, rng, mutate)
+                    if child is None:
+                        continue
+
+                new_population.append(child)
+                new_references.append(parent1 if worth_reference(kept, len(customer_ids)) else None)
+
+            # częściowy restart: gdy populacja zbiegła się do kilku rozwiązań, potomkowie z końca listy
+            # zastępowani są losowymi permutacjami; elity i imigranci zostają
+            if diversity is not None and diversity.restart_due():
+                if vectorized:
+                    diversity.restart_rows(new_population, protected, np_rng)
+                else:
+                    diversity.restart_list(new_population, protected, rng)
+                count = diversity.restart_count(population_size, protected)
+                new_references[population_size - count:] = [None] * count
+                if verbose:
+                    print(f"Restart {count} osobników w pokoleniu {gen + 1} "
+                          f"(różnorodność fitness {diversity.unique_fitness[-1]:.2f})")
+
+            population = new_population
+            if decode_cache is not None:
+                references = new_references
+
+            if profiler is not None:
+                profiler.end_generation(best_overall_fitness)
+
+            if telemetry is not None:
+                telemetry.generation(gen + 1, best_overall_fitness, best_vehicles_count, best_distance_val)
+
+            if stopping is not None and stopping.check(best_overall_fitness, best_vehicles_count, best_distance_val):
+                if verbose:
+                    print(f"Zatrzymanie po {gen + 1} pokoleniach (powód: {stopping.reason})")
+                if checkpoint is not None:
+                    save_checkpoint(gen + 1, True)
+                break
+
+            if checkpoint is not None and (checkpoint.due(gen + 1) or gen + 1 == generations):
+                save_checkpoint(gen + 1, gen + 1 == generations)
+    finally:
+        if evaluator is not None:
+            evaluator.close()
+        # zdarzenie końcowe także po wyjątku - odbiorca nie czeka na zadanie, które już nie liczy
+        if telemetry is not None:
+            telemetry.finish(len(cost_history), best_overall_fitness, best_vehicles_count, best_distance_val)
+
+    return best_overall_genome, best_vehicles_count, cost_history
+
+
+def solve(instance, params):
+    genome_cache = LRUCache(params.cache_size)
+    route_cache = LRUCache(params.route_cache_size)
+
+    profiler = None
+    if params.profile or params.progress_every:
+        # wyspy liczą w osobnych procesach - profil procesu głównego byłby pusty
+        if params.islands > 1:
+            raise ValueError("Profilowanie i linie postępu nie są obsługiwane w modelu wysp")
+        profiler = Profiler(params.progress_every, caches={"genome": genome_cache, "route": route_cache})
+
+    stopping = StoppingCriteria.from_params(params)
+    diversity = DiversityControl.from_params(params)
+
+    if params.telemetry is not None and params.islands > 1:
+        raise ValueError("Telemetria nie jest obsługiwana w modelu wysp")
+
+    # split nie ma czego przejąć od rodzica - potomek OX nie dzieli z nim prefiksu
+    if params.incremental and params.decoder != "greedy":
+        raise ValueError("Dekodowanie przyrostowe działa tylko z dekoderem greedy")
+
+    checkpoint = None
+    resume_state = None
+    seed, spawn_key = params.seed, params.spawn_key
+    if params.checkpoint:
+        if params.islands > 1:
+            raise ValueError("Checkpointy nie są obsługiwane w modelu wysp")
+        if params.resume:
+            resume_state = Checkpoint(params.checkpoint).load()
+            if resume_state is not None:
+                check_compatible(resume_state, instance, params)
+                # wznowiony przebieg zachowuje ziarno z checkpointu (także gdy pierwotnie było losowe)
+                if resume_state.get("seed") is not None:
+                    seed, spawn_key = resume_state["seed"], resume_state["spawn_key"]
+
+    seq = seed_sequence(seed, spawn_key)
+    rng, np_rng = make_rngs(seq)
+    if params.checkpoint:
+        checkpoint = Checkpoint(params.checkpoint, params.checkpoint_every, seq.entropy, seq.spawn_key)
+
+    # ujście otwierane tuż przed przebiegiem i zamykane także po wyjątku / przerwaniu
+    telemetry = None
+    if params.telemetry is not None:
+        sink = make_sink(params.telemetry) if isinstance(params.telemetry, str) else params.telemetry
+        telemetry = Telemetry(sink, params.generations, params.telemetry_job or instance.name,
+                              params.telemetry_interval)
+
+    start = time.perf_counter()
+    try:
+        if params.islands > 1:
+            if params.verbose:
+                print(f"\nSTART MODELU WYSP ({params.islands} wysp, migracja co {params.migration_interval} pokoleń)")
+            best_genome, best_vehicles, cost_history = run_islands(
+                instance, params,
+                lambda genome: evaluate_genome(genome, instance, genome_cache, route_cache, params.decoder,
+                                               local_search=params.local_search == "educate"), stopping, seq, diversity)
+        else:
+            best_genome, best_vehicles, cost_history = run_genetic_algorithm(
+                instance, params.population_size, params.generations, params.tournament_size, params.mutation_rate,
+                genome_cache, route_cache, params.workers, params.verbose, params.decoder, profiler,
+                incremental=params.incremental, local_search=params.local_search == "educate", stopping=stopping,
+                checkpoint=checkpoint, resume_state=resume_state, engine=params.engine,
+                rng=rng, np_rng=np_rng, telemetry=telemetry, diversity=diversity)
+    finally:
+        if telemetry is not None:
+            telemetry.close()
+    elapsed = time.perf_counter() - start
+    if resume_state is not None and resume_state["stopping"] is not None:
+        elapsed += resume_state["stopping"]["elapsed"]
+
+    raw_routes, _ = DECODERS[params.decoder](best_genome, instance)
+
+    final_routes = []
+    final_dist = 0.0
+    for r in raw_routes:
+        opt_r, opt_d = optimize_route_cached(r, instance, route_cache)
+        final_routes.append(opt_r)
+        final_dist += opt_d
+
+    if params.local_search != "none":
+        improved_routes, _ = improve_solution(final_routes, instance, vehicle_cost=calculate_fitness(1, 0.0))
+        final_routes = []
+        final_dist = 0.0
+        for r in improved_routes:
+            opt_r, opt_d = optimize_route_cached(r, instance, route_cache)
+            final_routes.append(opt_r)
+            final_dist += opt_d
+
+    cache_stats = {"genome": genome_cache.stats(), "route": route_cache.stats()}
+    profile = profiler.to_dict() if params.profile else None
+    return Result(instance, params, final_routes, final_dist, cost_history, elapsed, cache_stats, profile,
+                  stopping.reason, seq.entropy, seq.spawn_key,
+                  diversity.to_dict() if diversity is not None else None)
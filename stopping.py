@@ -0,0 +1,69 @@
+import time
+
+# powody zakończenia zapisywane w wyniku
+STOP_GENERATIONS = "generations"
+STOP_TIME_LIMIT = "time_limit"
+STOP_STALL = "stall"
+STOP_TARGET = "target"
+# wyspa zatrzymana, bo kryterium spełniła inna wyspa
+STOP_EXTERNAL = "external"
+
+
+class StoppingCriteria:
+    # time_limit - budżet czasu [s], stall_generations - pokolenia bez poprawy najlepszego fitness,
+    # target_fitness - docelowy fitness, bks - (pojazdy, dystans) najlepszego znanego rozwiązania,
+    # target_gap - dopuszczalna względna strata dystansu do bks przy nie większej liczbie pojazdów
+    def __init__(self, time_limit=None, stall_generations=0, target_fitness=None, bks=None, target_gap=0.0):
+        self.time_limit = time_limit
+        self.stall_generations = stall_generations
+        self.target_fitness = target_fitness
+        self.bks = bks
+        self.target_gap = target_gap
+        self.start()
+
+    @classmethod
+    def from_params(cls, params):
+        return cls(params.time_limit, params.stall_generations, params.target_fitness, params.bks, params.target_gap)
+
+    def start(self):
+        self.reason = STOP_GENERATIONS
+        self.generation = 0
+        self._start = time.perf_counter()
+        self._best = float('inf')
+        self._last_improvement = 0
+
+    def target_reached(self, best_fitness, best_vehicles, best_distance):
+        if self.target_fitness is not None and best_fitness <= self.target_fitness:
+            return True
+        if self.bks is not None:
+            bks_vehicles, bks_distance = self.bks
+            return best_vehicles <= bks_vehicles and best_distance <= bks_distance * (1.0 + self.target_gap)
+        return False
+
+    def check(self, best_fitness, best_vehicles, best_distance):
+        # wywoływane po każdym pokoleniu; zwraca powód zatrzymania albo None
+        self.generation += 1
+        if best_fitness < self._best:
+            self._best = best_fitness
+            self._last_improvement = self.generation
+
+        if self.target_reached(best_fitness, best_vehicles, best_distance):
+            self.reason = STOP_TARGET
+        elif self.stall_generations and self.generation - self._last_improvement >= self.stall_generations:
+            self.reason = STOP_STALL
+        elif self.time_limit is not None and time.perf_counter() - self._start >= self.time_limit:
+            self.reason = STOP_TIME_LIMIT
+        else:
+            return None
+        return self.reason
+
+    def state(self):
+        return {"generation": self.generation, "best": self._best, "last_improvement": self._last_improvement,
+                "elapsed": time.perf_counter() - self._start, "reason": self.reason}
+
+    def restore(self, state):
+        self.generation = state["generation"]
+        self._best = state["best"]
+        self._last_improvement = state["last_improvement"]
+        self._start = time.perf_counter() - state["elapsed"]
+        self.reason = state["reason"]
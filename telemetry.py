@@ -0,0 +1,184 @@
+import json
+import os
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from queue import Full
+
+# Zdarzenia z przebiegu GA: {"job", "generation", "generations", "best_fitness", "vehicles",
+# "distance", "gens_per_sec", "eta", "time", "done"}. Ujścia nigdy nie blokują pętli GA -
+# przy braku odbiorcy zdarzenie jest po prostu gubione.
+
+
+class JsonlSink:
+    def __init__(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.file = open(path, "a", buffering=1)
+
+    def emit(self, event):
+        self.file.write(json.dumps(event) + "\n")
+
+    def close(self):
+        self.file.close()
+
+
+class SocketSink:
+    # datagramy na lokalne gniazdo unix; brak słuchacza albo pełny bufor = zdarzenie pominięte
+    def __init__(self, path):
+        self.path = path
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.sock.setblocking(False)
+
+    def emit(self, event):
+        try:
+            self.sock.sendto(json.dumps(event).encode(), self.path)
+        except OSError:
+            pass
+
+    def close(self):
+        self.sock.close()
+
+
+class HttpSink:
+    # lokalny endpoint: GET / zwraca ostatnie zdarzenie jako JSON, serwer w wątku w tle
+    def __init__(self, port, host="127.0.0.1"):
+        self.latest = {}
+        sink = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = json.dumps(sink.latest).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    @property
+    def port(self):
+        return self.server.server_address[1]
+
+    def emit(self, event):
+        self.latest = event
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class QueueSink:
+    # kolejka multiprocessing (np. z Manager) - zbierana przez runner
+    def __init__(self, queue):
+        self.queue = queue
+
+    def emit(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except (Full, OSError, EOFError):
+            pass
+
+    def close(self):
+        pass
+
+
+def make_sink(spec):
+    # "jsonl:ścieżka", "unix:ścieżka", "http:port"
+    kind, _, target = spec.partition(":")
+    if kind == "jsonl":
+        return JsonlSink(target)
+    if kind == "unix":
+        return SocketSink(target)
+    if kind == "http":
+        return HttpSink(int(target))
+    raise ValueError(f"Nieznane ujście telemetrii: {spec}")
+
+
+class Telemetry:
+    def __init__(self, sink, generations, job=None, min_interval=1.0):
+        self.sink = sink
+        self.generations = generations
+        self.job = job
+        self.min_interval = min_interval
+        self.emitted = 0
+
+        self._start = time.monotonic()
+        self._last_emit = float('-inf')
+        self._last_generation = 0
+        self._last_time = self._start
+
+    def generation(self, generation, best_fitness, vehicles, distance):
+        # jedno porównanie czasu na pokolenie; zdarzenie najwyżej co min_interval sekund
+        now = time.monotonic()
+        if now - self._last_emit < self.min_interval:
+            return
+        self.emit(now, generation, best_fitness, vehicles, distance, False)
+
+    def emit(self, now, generation, best_fitness, vehicles, distance, done):
+        elapsed = now - self._last_time
+        rate = (generation - self._last_generation) / elapsed if elapsed > 0 else 0.0
+        eta = (self.generations - generation) / rate if rate > 0 else None
+
+        self.sink.emit({
+            "job": self.job,
+            "generation": generation,
+            "generations": self.generations,
+            "best_fitness": best_fitness,
+            "vehicles": vehicles,
+            "distance": distance,
+            "gens_per_sec": rate,
+            "eta": 0.0 if done else eta,
+            "time": now - self._start,
+            "done": done
+        })
+        self.emitted += 1
+        self._last_emit = now
+        self._last_generation = generation
+        self._last_time = now
+
+    def finish(self, generation, best_fitness, vehicles, distance):
+        # ostatnie zdarzenie zawsze wysyłane, także po wcześniejszym zatrzymaniu
+        self.emit(time.monotonic(), generation, best_fitness, vehicles, distance, True)
+
+    def close(self):
+        self.sink.close()
+
+
+class LiveSummary:
+    # agregacja zdarzeń w runnerze: ostatni stan każdego zadania w toku
+    def __init__(self, stall_seconds=300.0):
+        self.stall_seconds = stall_seconds
+        self.jobs = {}
+
+    def update(self, event):
+        job = self.jobs.get(event["job"])
+        if job is None or event["best_fitness"] < job["best_fitness"]:
+            improved_at = event["time"]
+        else:
+            improved_at = job["improved_at"]
+        if event["done"]:
+            self.jobs.pop(event["job"], None)
+            return
+        self.jobs[event["job"]] = dict(event, improved_at=improved_at)
+
+    def drop(self, job):
+        # zadanie zakończone błędem albo awarią procesu nie wyśle już zdarzenia "done"
+        self.jobs.pop(job, None)
+
+    def lines(self):
+        lines = []
+        for name, job in sorted(self.jobs.items(), key=lambda item: item[1]["gens_per_sec"]):
+            eta = f"{job['eta']:.0f}s" if job["eta"] is not None else "-"
+            stalled = job["time"] - job["improved_at"] >= self.stall_seconds
+            lines.append(f"  {name}: pok. {job['generation']}/{job['generations']} | {job['gens_per_sec']:.1f} pok/s"
+                         f" | ETA {eta} | best {job['best_fitness']:.2f}" + (" | BEZ POPRAWY" if stalled else ""))
+        return lines
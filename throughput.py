@@ -0,0 +1,170 @@
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+import traceback
+
+import numpy as np
+
+from instance import Instance
+from loader import parse_instance_file, table_arrays
+from pool import JobPool
+from solver import Params, solve
+
+# Tryb przepustowości: wiele małych instancji (25-100 klientów) w jednej puli procesów, każda
+# z własnym budżetem czasu. Procesy są używane wielokrotnie, instancja trafia do procesu jako
+# ścieżka albo tablice z JSON, a wyniki wychodzą liniami JSON w kolejności ukończenia.
+# Zadania nie drukują nic - jedyny tekst to podsumowanie na stderr.
+
+ARRAY_FIELDS = ("x", "y", "demand", "ready_time", "due_date", "service_time")
+
+
+def file_id(filename):
+    return os.path.splitext(os.path.basename(filename))[0]
+
+
+def read_directory(path, pattern="*.txt"):
+    for filename in sorted(glob.glob(os.path.join(path, pattern))):
+        yield {"id": file_id(filename), "file": filename}
+
+
+def read_jsonl(stream):
+    # linia: {"file": ścieżka} albo instancja wprost - "customers" jako wiersze tabeli Solomona
+    # lub osobne tablice ARRAY_FIELDS, plus "capacity" (i opcjonalnie "vehicles", "time_limit")
+    for number, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        item = json.loads(line)
+        if "id" not in item:
+            item["id"] = item.get("name") or (file_id(item["file"]) if "file" in item else f"line{number}")
+        yield item
+
+
+def read_jsonl_file(path):
+    with open(path) as f:
+        yield from read_jsonl(f)
+
+
+def instance_items(source):
+    if source == "-":
+        return read_jsonl(sys.stdin)
+    if os.path.isdir(source):
+        return read_directory(source)
+    return read_jsonl_file(source)
+
+
+def decode_item(item):
+    if "file" in item:
+        data = parse_instance_file(item["file"])
+    elif "customers" in item:
+        data = table_arrays(item["customers"])
+    else:
+        data = {field: np.asarray(item[field], dtype=np.float64) for field in ARRAY_FIELDS}
+    capacity = item.get("capacity", data.get("capacity"))
+    if capacity is None:
+        raise ValueError(f"Brak pojemności pojazdu w instancji {item['id']}")
+    return Instance(capacity, data["x"], data["y"], data["demand"], data["ready_time"], data["due_date"],
+                    data["service_time"], name=str(item["id"]), vehicles=item.get("vehicles", data.get("vehicles")))
+
+
+def solve_item(index, item, settings):
+    start = time.perf_counter()
+    try:
+        instance = decode_item(item)
+        result = solve(instance, Params(settings["population_size"], settings["generations"],
+                                        settings["tournament_size"], settings["mutation_rate"], verbose=False,
+                                        seed=settings["seed"], spawn_key=(index,), decoder=settings["decoder"],
+                                        engine=settings["engine"],
+                                        time_limit=item.get("time_limit", settings["time_limit"]),
+                                        stall_generations=settings["stall_generations"]))
+        return {
+            "id": item["id"],
+            "vehicles": result.num_vehicles,
+            "distance": result.distance,
+            "routes": result.routes,
+            "time": time.perf_counter() - start,
+            "stop_reason": result.stop_reason,
+            "generations_run": len(result.cost_history),
+            "seed": result.seed,
+            "spawn_key": list(result.spawn_key)
+        }
+    except Exception:
+        return {"id": item.get("id"), "error": traceback.format_exc()}
+
+
+def run_throughput(items, out, settings, max_workers=None):
+    # strumień wejściowy czytany leniwie: w locie najwyżej 2 instancje na proces; awaria procesu
+    # (np. OOM na dużej instancji) kończy się linią {id, error} tylko dla winnej instancji
+    max_workers = max_workers or os.cpu_count()
+    items = enumerate(items)
+    done = 0
+    failed = 0
+    with JobPool(solve_item, max_workers) as pool:
+        exhausted = False
+        while len(pool) or not exhausted:
+            while not exhausted and pool.free() > 0:
+                try:
+                    index, item = next(items)
+                except StopIteration:
+                    exhausted = True
+                    break
+                pool.submit(item, index, item, settings)
+
+            for item, record, crash in pool.wait():
+                if crash is not None:
+                    record = {"id": item.get("id"), "error": crash}
+                done += 1
+                if "error" in record:
+                    failed += 1
+                out.write(json.dumps(record) + "\n")
+                out.flush()
+    return done, failed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument("source", help="katalog z plikami instancji, plik JSONL albo '-' (JSONL ze stdin)")
+    parser.add_argument("--output", default="-", help="plik wyników JSONL ('-' = stdout)")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--time-limit", type=float, default=5.0, help="budżet czasu GA na instancję [s]")
+    parser.add_argument("--stall-generations", type=int, default=0, help="stop po N pokoleniach bez poprawy")
+    parser.add_argument("--population-size", type=int, default=50)
+    parser.add_argument("--generations", type=int, default=100000)
+    parser.add_argument("--tournament-size", type=int, default=5)
+    parser.add_argument("--mutation-rate", type=float, default=0.05)
+    parser.add_argument("--decoder", choices=["greedy", "split"], default="greedy")
+    parser.add_argument("--engine", choices=["list", "numpy"], default="list")
+    parser.add_argument("--seed", type=int, default=None, help="ziarno bazowe; instancja i dostaje spawn_key=(i,)")
+
+    args = parser.parse_args()
+
+    settings = {
+        "population_size": args.population_size,
+        "generations": args.generations,
+        "tournament_size": args.tournament_size,
+        "mutation_rate": args.mutation_rate,
+        "time_limit": args.time_limit,
+        "stall_generations": args.stall_generations,
+        "decoder": args.decoder,
+        "engine": args.engine,
+        "seed": args.seed
+    }
+
+    start = time.perf_counter()
+    out = sys.stdout if args.output == "-" else open(args.output, "a")
+    try:
+        done, failed = run_throughput(instance_items(args.source), out, settings, args.workers)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    print(f"Rozwiązano {done - failed} instancji (błędy: {failed}) w {time.perf_counter() - start:.1f}s",
+          file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
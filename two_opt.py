@@ -0,0 +1,140 @@
+def _reverse(seq, a, b):
+    while a < b:
+        seq[a], seq[b] = seq[b], seq[a]
+        a += 1
+        b -= 1
+
+
+def _schedule(p, ready, due, service, dist_matrix, dep, lat):
+    # dep[k] - najwcześniejszy czas wyjazdu z p[k]
+    # lat[k] - najpóźniejszy czas przyjazdu do p[k], przy którym reszta trasy jest wykonalna
+    n = len(p)
+    current_time = 0.0
+    dep[0] = 0.0
+    for k in range(1, n - 1):
+        arrival_time = current_time + dist_matrix[p[k - 1]][p[k]]
+        if arrival_time > due[k]:
+            return False
+        current_time = max(arrival_time, ready[k]) + service[k]
+        dep[k] = current_time
+
+    if current_time + dist_matrix[p[n - 2]][0] > due[n - 1]:
+        return False
+
+    lat[n - 1] = due[n - 1]
+    for k in range(n - 2, 0, -1):
+        lat[k] = min(due[k], lat[k + 1] - dist_matrix[p[k]][p[k + 1]] - service[k])
+
+    return True
+
+
+def _find_move(p, ready, due, service, dist_matrix, compat, dep, lat, first_improvement, start):
+    # Odwrócenie p[a..b] zmienia tylko krawędzie (p[a-1], p[a]) i (p[b], p[b+1]).
+    # Odwrócony segment opisują (A, B, L): wyjazd z ostatniego klienta segmentu to
+    # max(przyjazd + A, B), a przyjazd do pierwszego klienta nie może przekroczyć L.
+    # Krawędzie niedozwolone w macierzy zgodności odrzucają ruch bez liczenia czasów.
+    n = len(p) - 2
+    best_delta = -0.01
+    best_move = None
+
+    for a in range(start, n - 1):
+        prev = p[a - 1]
+        row_prev = dist_matrix[prev]
+        first = p[a]
+        row_first = dist_matrix[first]
+        compat_prev = compat[prev]
+        compat_first = compat[first]
+        removed_in = row_prev[first]
+        dep_prev = dep[a - 1]
+
+        seg_a = service[a]
+        seg_b = ready[a] + service[a]
+        seg_l = due[a]
+        last = first
+
+        for b in range(a + 1, n + 1):
+            node = p[b]
+            if not compat[node][last]:
+                break
+            d = dist_matrix[node][last]
+            offset = service[b] + d
+            if ready[b] + offset > seg_l:
+                break
+            seg_l = min(due[b], seg_l - offset)
+            seg_b = max(seg_b, ready[b] + offset + seg_a)
+            seg_a += offset
+            last = node
+
+            if b - a < 2:
+                continue
+
+            nxt = p[b + 1]
+            if not compat_prev[node] or not compat_first[nxt]:
+                continue
+            delta = row_prev[node] + row_first[nxt] - removed_in - dist_matrix[node][nxt]
+            if delta >= best_delta:
+                continue
+
+            arrival_time = dep_prev + row_prev[node]
+            if arrival_time > seg_l:
+                continue
+            if max(arrival_time + seg_a, seg_b) + row_first[nxt] > lat[b + 1]:
+                continue
+
+            best_delta = delta
+            best_move = (a, b)
+            if first_improvement:
+                return best_move
+
+    return best_move
+
+
+def optimize_route_2opt(route, instance, strategy="first", profiler=None):
+    dist_matrix = instance.dist_rows
+    compat = instance.compat_rows
+    ready_times = instance.ready_times
+    due_dates = instance.due_dates
+    service_times = instance.service_times
+    demands = instance.demands
+
+    p = [0] + list(route) + [0]
+    ready = [ready_times[c] for c in p]
+    due = [due_dates[c] for c in p]
+    service = [service_times[c] for c in p]
+    dep = [0.0] * len(p)
+    lat = [0.0] * len(p)
+
+    load = sum(demands[c] for c in route)
+    if load > instance.capacity or not _schedule(p, ready, due, service, dist_matrix, dep, lat):
+        return list(route), 0.0
+
+    # first: po ruchu skan jest kontynuowany od tego samego a, pełny przebieg bez poprawy kończy
+    # best: w każdym przebiegu stosowany jest najlepszy ruch
+    first_improvement = strategy == "first"
+    start = 1
+    scans = 0
+    moves = 0
+    while True:
+        move = _find_move(p, ready, due, service, dist_matrix, compat, dep, lat, first_improvement, start)
+        scans += 1
+        if move is None:
+            if start == 1:
+                break
+            start = 1
+            continue
+        a, b = move
+        for seq in (p, ready, due, service):
+            _reverse(seq, a, b)
+        _schedule(p, ready, due, service, dist_matrix, dep, lat)
+        start = a if first_improvement else 1
+        moves += 1
+
+    if profiler is not None:
+        profiler.count("two_opt_scans", scans)
+        profiler.count("two_opt_moves", moves)
+
+    total_dist = 0.0
+    for k in range(len(p) - 1):
+        total_dist += dist_matrix[p[k]][p[k + 1]]
+
+    return p[1:-1], total_dist